@@ -0,0 +1,305 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Computes every router's routes at once with NumPy instead of letting the
+routing protocol converge message by message. The routers and the links
+between them make a graph weighted by Interface.cost; the cost from every
+router to every destination (the routers' configured routes, such as their
+directly connected hosts) is found by repeated min-plus relaxation, a
+Bellman-Ford over all destinations at once:
+
+    cost[r, dst] = min(configured[r, dst], min over links r->v of cost(link) + cost[v, dst])
+
+Each sweep costs a few array operations per link of the busiest router and
+the sweeps stop at about the network's diameter, so sparse networks of a few
+thousand routers take seconds rather than the n^3 of Floyd-Warshall. The
+cost matrix holds routers x destinations integers; filling in the routers'
+tables still takes a Python dict entry per route. On a 2,500-router grid
+(6.25 million routes, 50 sweeps) seeding takes about 8 seconds on one core:
+3 to 4 for the relaxation, 1.5 for the neighbors' distance vectors and 4
+for the tables, most of that the dict entries.
+
+The result seeds the routers' tables and protocol state for a cold start, or
+checks the tables the protocol converged to.
+'''
+from routing import DistanceVector, LinkState, set_routes
+try:
+    import numpy
+except ImportError:
+    numpy = None #ShortestPaths raises without it
+
+## shortest paths from every router to every destination
+class ShortestPaths:
+
+    ##@param router_L: routers, hosts and other objects in the list are ignored
+    # @param link_layer: LinkLayer of the network, links that are down are left out
+    def __init__(self, router_L, link_layer):
+        if numpy is None:
+            raise Exception('ShortestPaths: numpy is not installed')
+        self.router_L = [router for router in router_L if hasattr(router, 'routing')]
+        self.infinity = min([router.routing.infinity for router in self.router_L] + [DistanceVector.infinity])
+        index_D = {id(router): r for r, router in enumerate(self.router_L)}
+        #directed links between routers, (router, neighbor router, cost, interface) sorted by router and interface
+        edge_L = []
+        for link in link_layer.link_L:
+            if not getattr(link, 'up', True):
+                continue
+            u = index_D.get(id(link.node_1))
+            v = index_D.get(id(link.node_2))
+            if u is None or v is None:
+                continue
+            for a, b, node, intf in [(u, v, link.node_1, link.node_1_intf), (v, u, link.node_2, link.node_2_intf)]:
+                if node.intf_L[intf].cost < self.infinity:
+                    edge_L.append((a, b, node.intf_L[intf].cost, intf))
+        edge_L.sort(key=lambda edge: (edge[0], edge[3]))
+        self.edge_L = edge_L
+        #the neighbors and link costs of each router, one row per link slot;
+        #slots a router does not use point at an extra unreachable row
+        degree_L = [0] * len(self.router_L)
+        for a, b, cost, intf in edge_L:
+            degree_L[a] += 1
+        self.edge_start_L = [0]
+        for degree in degree_L:
+            self.edge_start_L.append(self.edge_start_L[-1] + degree)
+        slots = max(degree_L + [0])
+        self.neighbor = numpy.full((slots, len(self.router_L)), len(self.router_L))
+        #the interface of each link slot, -1 for slots not in use
+        self.interface = numpy.full((slots, len(self.router_L)), -1)
+        weight_L = [[0] * len(self.router_L) for k in range(slots)]
+        for a, b, cost, intf in edge_L:
+            k = degree_L[a] = degree_L[a] - 1
+            self.neighbor[k, a] = b
+            self.interface[k, a] = intf
+            weight_L[k][a] = cost
+
+        #configured routes on interfaces that are up
+        dst_S = set()
+        for router in self.router_L:
+            for dst, intf_cost_D in router.routing.static_D.items():
+                if any(router.intf_L[intf].up for intf in intf_cost_D):
+                    dst_S.add(dst)
+        self.dst_L = sorted(dst_S)
+        self.dst_index_D = {dst: j for j, dst in enumerate(self.dst_L)}
+        #the destinations as an array, to pick out the reachable ones of a router at once
+        self.dst_key = numpy.array(self.dst_L, dtype=numpy.int64)
+        configured_L = [self.configured(router) for router in self.router_L]
+        #costs fit 32-bit integers unless links are very expensive; a path
+        #costs at most every link plus one configured route
+        bound = sum(cost for a, b, cost, intf in edge_L) + max([cost for route_D in configured_L for cost in route_D.values()] + [0])
+        dtype = numpy.int32 if 2 * bound < 1 << 30 else numpy.int64
+        ## cost of an unreachable destination in the cost matrix, safe from overflow when link costs are added
+        self.unreachable = 1 << (30 if dtype == numpy.int32 else 62)
+        self.weight = numpy.array(weight_L, dtype=dtype).reshape(slots, len(self.router_L))
+        #one row per router and the unreachable row
+        self.cost = numpy.full((len(self.router_L) + 1, len(self.dst_L)), self.unreachable, dtype=dtype)
+        for r, route_D in enumerate(configured_L):
+            for dst, cost in route_D.items():
+                self.cost[r, self.dst_index_D[dst]] = cost
+        self.relax()
+
+    ## cheapest configured route of a router to each destination, on interfaces that are up
+    # @return {destination: cost}
+    def configured(self, router):
+        route_D = {}
+        for dst, intf_cost_D in router.routing.static_D.items():
+            cost_L = [cost for intf, cost in intf_cost_D.items() if router.intf_L[intf].up]
+            if cost_L and min(cost_L) < self.infinity:
+                route_D[dst] = min(cost_L)
+        return route_D
+
+    ## min-plus relaxation to a fixed point. Each sweep relaxes every router
+    # through one link slot at a time, in place, so that a sweep can carry
+    # costs several links further (Gauss-Seidel rather than Jacobi order)
+    def relax(self):
+        n = len(self.router_L)
+        cost = self.cost[:n] #a view, updated in place
+        while True:
+            previous = cost.copy()
+            for k in range(len(self.neighbor)):
+                #costs through the links of slot k, added to in place rather than
+                #into another routers x destinations array
+                through = self.cost[self.neighbor[k]]
+                through += self.weight[k][:, None]
+                numpy.minimum(cost, through, out=cost)
+            if numpy.array_equal(previous, cost):
+                break
+        cost[cost >= self.infinity] = self.unreachable
+
+    ## first hops of routers over links, for every destination at once: bit k,
+    # in numpy.packbits order, is set where the link in slot k of the router is
+    # on a shortest path to the destination
+    # @param start, stop: routers start..stop-1 of router_L, None for all of them
+    # @return uint8 array, link slots in bytes x routers x destinations
+    def hop_bits(self, start=0, stop=None):
+        stop = len(self.router_L) if stop is None else stop
+        bits = numpy.zeros(((len(self.neighbor) + 7) // 8, stop - start, len(self.dst_L)), dtype=numpy.uint8)
+        best = self.cost[start:stop]
+        for k in range(len(self.neighbor)):
+            equal = self.weight[k, start:stop, None] + self.cost[self.neighbor[k, start:stop]] == best
+            bits[k // 8] |= equal.view(numpy.uint8) << (7 - k % 8)
+        return bits
+
+    ## first hops of one router over links, as arrays over its reachable destinations
+    # @param r: index of the router in router_L
+    # @param bits: the router's hop_bits, link slots in bytes x destinations, None to compute them
+    # @return (destination indices, costs, hop_L, combinations), hop_L lists the
+    #   distinct combinations of first hop interfaces, in interface order, and
+    #   combinations gives the one of each destination as an index into hop_L
+    def first_hops(self, r, bits=None):
+        reachable = numpy.flatnonzero(self.cost[r] < self.unreachable)
+        best = self.cost[r, reachable]
+        if not len(self.neighbor):
+            return reachable, best, [()], numpy.zeros(len(reachable), dtype=int)
+        if bits is None:
+            bits = self.hop_bits(r, r + 1)[:, 0]
+        #the links of each destination packed into bytes, compared as one value
+        #however many links the router has
+        packed = numpy.ascontiguousarray(bits[:, reachable].T)
+        if packed.shape[1] == 1:
+            key = packed.reshape(-1)
+        else:
+            key = packed.view(numpy.dtype((numpy.void, packed.shape[1]))).reshape(-1)
+        unique, first, combination = numpy.unique(key, return_index=True, return_inverse=True)
+        slot = numpy.unpackbits(packed[first], axis=1)[:, :len(self.neighbor)].astype(bool)
+        interface = self.interface[:, r]
+        hop_L = [tuple(sorted(interface[row].tolist())) for row in slot]
+        return reachable, best, hop_L, combination.reshape(-1)
+
+    ## routes of one router: cost and equal-cost first hops to each reachable destination
+    # @param r: index of the router in router_L
+    # @return {destination: (cost, [interface, ...])}
+    def routes(self, r):
+        route_D = {}
+        reachable, best, hop_L, combination = self.first_hops(r)
+        for j, cost, k in zip(reachable.tolist(), best.tolist(), combination.tolist()):
+            route_D[self.dst_L[j]] = (cost, list(hop_L[k]))
+        for dst in self.router_L[r].routing.static_D:
+            if dst in route_D:
+                route_D[dst] = self.route(r, dst)
+        return route_D
+
+    ## route of one router to one reachable destination
+    # @param r: index of the router in router_L
+    # @param dst: destination
+    # @return (cost, [interface, ...])
+    def route(self, r, dst):
+        router = self.router_L[r]
+        j = self.dst_index_D[dst]
+        cost = int(self.cost[r, j])
+        hop_L = [intf for intf, intf_cost in router.routing.static_D.get(dst, {}).items()
+                 if intf_cost == cost and router.intf_L[intf].up]
+        for a, b, link_cost, intf in self.edge_L[self.edge_start_L[r] : self.edge_start_L[r + 1]]:
+            if link_cost + int(self.cost[b, j]) == cost:
+                hop_L.append(intf)
+        return cost, hop_L
+
+    ## cost from a router to a destination
+    # @return the cost, None if the destination is unreachable
+    def distance(self, router, dst):
+        if dst not in self.dst_index_D:
+            return None
+        cost = int(self.cost[self.router_L.index(router), self.dst_index_D[dst]])
+        return cost if cost < self.unreachable else None
+
+    ## cost from a router to each destination it reaches
+    # @param r: index of the router in router_L
+    # @return {destination: cost}
+    def vector(self, r):
+        reachable = numpy.flatnonzero(self.cost[r] < self.unreachable)
+        return dict(zip(self.dst_key[reachable].tolist(), self.cost[r, reachable].tolist()))
+
+    ## fill every router's routing table and forwarding table with the shortest
+    # paths, for a cold start without running the routing protocol. The first
+    # hops of all the routers come out of hop_bits at once; what is left per
+    # router is a dict entry per route, so a few thousand routers still take
+    # seconds (routes with the same cost and hops share one {interface: cost}
+    # dict, as the routing engines only ever replace them)
+    # @param state: also fill in the protocol state the routers would have
+    #   converged to (the neighbors' distance vectors, or the link-state
+    #   database), so that the protocol carries on from the seeded tables;
+    #   it takes as much memory as a converged network
+    def seed(self, state=True):
+        if state:
+            self.seed_state()
+        bits = self.hop_bits()
+        for r, router in enumerate(self.router_L):
+            engine = router.routing
+            router.rt_tbl_D.clear()
+            router.fib_D.clear()
+            if engine.multipath_D is not None:
+                engine.multipath_D.clear()
+            reachable, best, hop_L, combination = self.first_hops(r, bits[:, r])
+            #hops are in interface order like set_routes
+            if engine.multipath_D is None:
+                hop_L = [hops[:1] for hops in hop_L]
+            #configured routes are set below, they may add hops the links do not show
+            static = numpy.zeros(len(self.dst_L), dtype=bool)
+            static[[self.dst_index_D[dst] for dst in engine.static_D if dst in self.dst_index_D]] = True
+            link = ~static[reachable]
+            reachable, best, combination = reachable[link], best[link], combination[link]
+            #one {interface: cost} per distinct cost and combination of hops
+            cost_L, cost_index = numpy.unique(best, return_inverse=True)
+            route_key, route_index = numpy.unique(cost_index.reshape(-1) * len(hop_L) + combination, return_inverse=True)
+            value_L = [dict.fromkeys(hop_L[k], cost) for k, cost in
+                       zip((route_key % len(hop_L)).tolist(), cost_L[route_key // len(hop_L)].tolist())]
+            dst_L = self.dst_key[reachable].tolist()
+            combination_L = combination.tolist()
+            router.rt_tbl_D.update(zip(dst_L, map(value_L.__getitem__, route_index.reshape(-1).tolist())))
+            router.fib_D.update(zip(dst_L, map([hops[0] if hops else None for hops in hop_L].__getitem__, combination_L)))
+            if engine.multipath_D is not None:
+                engine.multipath_D.update((dst, hop_L[k]) for dst, k in zip(dst_L, combination_L) if len(hop_L[k]) > 1)
+            for dst in engine.static_D:
+                if dst in self.dst_index_D and self.cost[r, self.dst_index_D[dst]] < self.unreachable:
+                    set_routes(engine, dst, *self.route(r, dst))
+
+    ## fill in the routers' protocol state, see seed(). The distance vector
+    # of each router is built once from its row of the cost matrix and copied
+    # to each neighbor, which changes its copy in place as updates come in
+    def seed_state(self):
+        lsdb_D = {}
+        for r, router in enumerate(self.router_L):
+            engine = router.routing
+            if isinstance(engine, LinkState):
+                edge_L = self.edge_L[self.edge_start_L[r] : self.edge_start_L[r + 1]]
+                engine.neighbor_D = {intf: self.router_L[b].name for a, b, cost, intf in edge_L}
+                origin, seq, link_D, stub_D = engine.originate()
+                lsdb_D[origin] = (seq, link_D, stub_D)
+            else:
+                engine.neighbor_D = {}
+        #the links into each router, (router, neighbor router, cost, interface) by neighbor router
+        into_L = sorted((edge for edge in self.edge_L if not isinstance(self.router_L[edge[0]].routing, LinkState)),
+                        key=lambda edge: edge[1])
+        vector_D, b = None, None
+        for a, b_next, cost, intf in into_L:
+            if b_next != b:
+                b = b_next
+                vector_D = self.vector(b)
+                self.router_L[a].routing.neighbor_D[intf] = vector_D
+            else:
+                self.router_L[a].routing.neighbor_D[intf] = vector_D.copy()
+        for router in self.router_L:
+            if isinstance(router.routing, LinkState):
+                router.routing.lsdb_D.update(lsdb_D)
+            else:
+                router.routing.neighbor_D = dict(sorted(router.routing.neighbor_D.items()))
+
+    ## compare the routing tables of the routers with the shortest paths. Route
+    # summaries are not modelled, their tables are not shortest paths to each
+    # destination, so routers configured with summaries cannot be checked
+    # @return list of (router name, destination, shortest path cost, routing table cost)
+    #   of the routes that differ, None standing for no route
+    def check(self):
+        if any(getattr(router, 'summary_D', None) for router in self.router_L):
+            raise Exception('ShortestPaths: cannot check the routing tables of routers with route summaries')
+        mismatch_L = []
+        for r, router in enumerate(self.router_L):
+            expected_D = self.vector(r)
+            for dst in set(expected_D) | set(router.rt_tbl_D):
+                actual = min(router.rt_tbl_D[dst].values()) if dst in router.rt_tbl_D else None
+                if actual is not None and actual >= self.infinity:
+                    actual = None
+                if expected_D.get(dst) != actual:
+                    mismatch_L.append((router.name, dst, expected_D.get(dst), actual))
+        return sorted(mismatch_L, key=str)
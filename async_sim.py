@@ -0,0 +1,146 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+import asyncio
+import gc
+
+## readiness notification for a coroutine, registered with Interface.watch in
+# place of a Readiness; the coroutine awaits wait() instead of blocking a thread
+class AsyncReadiness:
+
+    ##@param runtime: AsyncSimulator keeping track of which coroutines have work
+    def __init__(self, runtime):
+        self.runtime = runtime
+        self.event = asyncio.Event()
+
+    ## called by Interface.put
+    def notify(self):
+        self.event.set()
+        self.runtime.ready(self)
+
+    ## sleep until notified
+    # @param timeout: longest time to sleep in seconds, None to sleep until notified
+    # @param busy: True to keep the runtime from counting this coroutine as idle while it sleeps
+    async def wait(self, timeout=None, busy=False):
+        if not self.event.is_set() and not busy:
+            self.runtime.drained(self)
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.event.clear()
+
+
+## Runs every host, router and link as a coroutine on one asyncio event loop
+# in place of one thread per Host, Router and LinkLayer. Each coroutine
+# drains its interface queues (Host.udt_receive, Router.process_queues,
+# Link.tx_pkt) and then awaits a put into one of them. The scripts drive it
+# like the EventSimulator: run() returns once no packets are left, and stop()
+# cancels the coroutines rather than setting stop flags.
+class AsyncSimulator:
+
+    ##@param link_layer: LinkLayer whose links each get a coroutine
+    # @param object_L: hosts and routers (other objects in the list are ignored)
+    def __init__(self, link_layer, object_L):
+        self.loop = asyncio.new_event_loop()
+        self.ready_S = set() #readiness objects notified and not yet drained
+        self.idle_event = asyncio.Event() #set while ready_S is empty
+        self.task_L = []
+        #as in Topology, creating tens of thousands of coroutines is much faster
+        #without the cyclic garbage collector rescanning them
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.start(link_layer, object_L)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    ## called when printing the object
+    def __str__(self):
+        return 'AsyncSimulator'
+
+    ## current time of the event loop, in seconds
+    def clock(self):
+        return self.loop.time()
+
+    ## start the coroutines, see __init__ for the parameters
+    def start(self, link_layer, object_L):
+        for link in link_layer.link_L:
+            self.serve(link.tx_pkt, [(link.node_1.intf_L[link.node_1_intf], 'out'),
+                                     (link.node_2.intf_L[link.node_2_intf], 'out')])
+        for obj in object_L:
+            if hasattr(obj, 'process_queues'):
+                if hasattr(obj, 'timers'):
+                    #routing update timers run on the event loop clock
+                    obj.clock = self.loop.time
+                self.serve(obj.process_queues, [(intf, 'in') for intf in obj.intf_L], obj)
+            elif hasattr(obj, 'udt_receive'):
+                self.serve(obj.udt_receive, [(intf, 'in') for intf in obj.intf_L])
+
+    ## start a coroutine servicing some interface queues
+    # @param handler: called with no arguments to service the queues, returns a
+    #   false value once there is nothing left to do
+    # @param intf_L: list of (interface, in_or_out) pairs the handler services
+    # @param router: router whose routing update timers the coroutine runs, None for none
+    def serve(self, handler, intf_L, router=None):
+        readiness = AsyncReadiness(self)
+        for intf, in_or_out in intf_L:
+            intf.watch(in_or_out, readiness)
+        if router is not None and hasattr(router, 'timers'):
+            #a held-down update wakes the coroutine to wait for its time
+            router.arm_timers = readiness.notify
+        self.task_L.append(self.loop.create_task(self.service(handler, readiness, router)))
+
+    ## coroutine draining the queues each time a packet is put into one
+    async def service(self, handler, readiness, router):
+        while True:
+            if router is None or not hasattr(router, 'timers'):
+                await readiness.wait()
+            else:
+                #a held-down triggered update keeps run() waiting, the periodic refresh does not
+                due = router.timers()
+                await readiness.wait(None if due is None else max(0, due - self.loop.time()), bool(router.pending_S))
+            while handler():
+                pass
+
+    ## a coroutine has work, its readiness object was notified
+    def ready(self, readiness):
+        self.ready_S.add(readiness)
+        self.idle_event.clear()
+
+    ## a coroutine drained its queues and has no routing update waiting
+    def drained(self, readiness):
+        self.ready_S.discard(readiness)
+        if not self.ready_S:
+            self.idle_event.set()
+
+    ## coroutine that returns once every coroutine has drained its queues; it
+    # sleeps meanwhile, also while held-down routing updates wait for their time
+    async def idle(self):
+        await asyncio.sleep(0)
+        while self.ready_S:
+            await self.idle_event.wait()
+
+    ## run the coroutines
+    # @param seconds: how long to run, None to run until no packets are left
+    def run(self, seconds=None):
+        if seconds is None:
+            self.loop.run_until_complete(self.idle())
+        else:
+            self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    ## cancel the coroutines and close the event loop
+    def stop(self):
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for task in self.task_L:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*self.task_L, return_exceptions=True))
+            self.loop.close()
+        finally:
+            if gc_enabled:
+                gc.enable()
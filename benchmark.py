@@ -0,0 +1,359 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Throughput and latency benchmark for the simulator. Builds a line, ring,
+grid or random topology with one host per router, lets the routing
+protocol converge, sends a packet load between random host pairs and prints
+the results as JSON, e.g.
+
+    python benchmark.py --topology grid --routers 100 --packets 10000
+
+With --seed-routes the routing tables are computed in bulk by apsp instead
+of by the routing protocol, which leaves large networks quick to set up.
+'''
+import network_2
+import link_2
+import apsp
+import event_sim
+import interface
+import metrics
+import prefix
+import tracing
+import traffic
+import argparse
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+
+## topology generators, each returns a list of (router, router, cost) edges
+# between routers numbered 0..n-1
+
+def line_edges(n, rng):
+    return [(r, r + 1, 1) for r in range(n - 1)]
+
+def ring_edges(n, rng):
+    return line_edges(n, rng) + ([(n - 1, 0, 1)] if n > 2 else [])
+
+def grid_edges(n, rng):
+    cols = int(math.ceil(math.sqrt(n)))
+    edge_L = []
+    for r in range(n):
+        if (r + 1) % cols != 0 and r + 1 < n:
+            edge_L.append((r, r + 1, 1))
+        if r + cols < n:
+            edge_L.append((r, r + cols, 1))
+    return edge_L
+
+## random connected graph: a random spanning tree plus extra edges up to the
+# requested average degree, with random costs
+def random_edges(n, rng, degree=3, max_cost=10):
+    edge_S = set()
+    for r in range(1, n):
+        edge_S.add((rng.randrange(r), r))
+    while len(edge_S) < min(n * degree // 2, n * (n - 1) // 2):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v and (u, v) not in edge_S and (v, u) not in edge_S:
+            edge_S.add((u, v))
+    return [(u, v, rng.randint(1, max_cost)) for u, v in sorted(edge_S)]
+
+topology_D = {'line': line_edges, 'ring': ring_edges, 'grid': grid_edges, 'random': random_edges}
+
+
+## host that records when each benchmark packet arrives
+class BenchHost(network_2.Host):
+
+    ##@param addr: address of this node represented as an integer
+    # @param bench: Benchmark collecting the arrival times
+    def __init__(self, addr, bench):
+        network_2.Host.__init__(self, addr)
+        self.bench = bench
+
+    ## receive packet from the network layer and note its arrival
+    def udt_receive(self):
+        p = network_2.Host.udt_receive(self)
+        if p is not None and p.prot_S == 'data':
+            self.bench.received(int(p.data_S))
+            p.release()
+        return p
+
+
+## one benchmark run: builds the network and measures it
+class Benchmark:
+
+    ##@param edge_L: list of (router, router, cost) edges
+    # @param n: number of routers
+    # @param max_queue_size: max queue length of router interfaces
+    # @param routing_D: routing options passed to the routers (hold_down, refresh_interval, ecmp), None for none
+    # @param area_size: routers per area, 0 for none; routers r of area r // area_size
+    #   advertise their area's hosts to other areas as summary prefixes
+    def __init__(self, edge_L, n, max_queue_size=0, routing_D=None, area_size=0):
+        if routing_D is None:
+            routing_D = {}
+        self.n = n
+        self.clock = time.perf_counter
+        self.send_time_D = {} #packet number -> send time
+        self.hops_D = {} #packet number -> links on its path
+        self.latency_L = [] #(end-to-end latency, hops) of each delivered packet
+        self.lock = threading.Lock()
+        self.seeded = False #routing tables filled in by seed_routes rather than the protocol
+        #interface 0 of router r connects host r+1, interface k+1 its k-th neighbor
+        neighbor_L = [[] for r in range(n)]
+        for u, v, cost in edge_L:
+            neighbor_L[u].append((v, cost))
+            neighbor_L[v].append((u, cost))
+        self.host_L = [BenchHost(r + 1, self) for r in range(n)]
+        self.router_L = [network_2.Router(name=str(r),
+                                          intf_cost_L=[1] + [cost for v, cost in neighbor_L[r]],
+                                          rt_tbl_D={r + 1: {0: 1}},
+                                          max_queue_size=max_queue_size,
+                                          summary_D=self.summaries(r, neighbor_L[r], area_size),
+                                          **routing_D) for r in range(n)]
+        #router reached through each (router, interface), None for the host
+        self.next_router_D = {(r, 0): None for r in range(n)}
+        self.link_layer = link_2.LinkLayer()
+        for r in range(n):
+            self.link_layer.add_link(link_2.Link(self.host_L[r], 0, self.router_L[r], 0))
+        for u, v, cost in edge_L:
+            u_intf = neighbor_L[u].index((v, cost)) + 1
+            v_intf = neighbor_L[v].index((u, cost)) + 1
+            self.next_router_D[(u, u_intf)] = v
+            self.next_router_D[(v, v_intf)] = u
+            self.link_layer.add_link(link_2.Link(self.router_L[u], u_intf, self.router_L[v], v_intf))
+
+    ## route summaries of a router: its area's hosts on the interfaces to other areas
+    # @param r: router number
+    # @param neighbor_L: (router, cost) reached through each interface but the host's
+    # @param area_size: routers per area, 0 for no summaries
+    # @return summary_D option of the router
+    def summaries(self, r, neighbor_L, area_size):
+        if not area_size:
+            return None
+        area = r // area_size
+        #hosts r+1 of the area's routers
+        summary_L = prefix.cover(area * area_size + 1, min(self.n, (area + 1) * area_size))
+        return {k + 1: summary_L for k, (v, cost) in enumerate(neighbor_L) if v // area_size != area}
+
+    ## fill in the routing tables with the shortest paths computed in bulk,
+    # so that the routing protocol need not converge
+    # @return seconds taken
+    def seed_routes(self):
+        wall = time.perf_counter()
+        apsp.ShortestPaths(self.router_L, self.link_layer).seed()
+        self.seeded = True
+        return time.perf_counter() - wall
+
+    ## start the routing protocol, unless the tables were seeded
+    def start_routing(self):
+        if not self.seeded:
+            for router in self.router_L:
+                router.send_routes()
+
+    ## number of links a packet crosses from host src to host dst, following the FIBs
+    def hops(self, src, dst):
+        r, hops = src - 1, 1
+        while r is not None and hops <= self.n + 1:
+            fib_D = self.router_L[r].fib_D
+            match = fib_D.match(dst)
+            if match is None:
+                return None
+            intf = fib_D[match]
+            r, hops = self.next_router_D[(r, intf)], hops + 1
+        return hops
+
+    ## send benchmark packet k from host src to host dst
+    # @param size: payload length in bytes, 0 for the packet number alone
+    def send(self, k, src, dst, size=0):
+        with self.lock:
+            self.send_time_D[k] = self.clock()
+            self.hops_D[k] = self.hops(src, dst)
+        self.host_L[src - 1].udt_send(dst, src, str(k).ljust(size))
+
+    ## called by BenchHost when packet k arrives
+    def received(self, k):
+        now = self.clock()
+        with self.lock:
+            self.latency_L.append((now - self.send_time_D[k], self.hops_D[k]))
+
+    ## run the benchmark on the discrete-event simulator, times are virtual
+    # @param send_L: (send time, source host, destination host, size) of each packet
+    # @param settle: virtual time given to routing to converge when periodic
+    #   refreshes keep the simulator from running out of events, None to run until it does
+    def run_event_driven(self, send_L, settle=None):
+        sim = event_sim.EventSimulator(self.link_layer, self.host_L + self.router_L)
+        self.clock = sim.clock
+        wall = time.perf_counter()
+        self.start_routing()
+        sim.run(settle)
+        convergence = {'time': metrics.control_plane(metrics.snapshot(self.router_L))['last_change'] or 0,
+                       'wall_s': time.perf_counter() - wall}
+        start = sim.now
+        wall = time.perf_counter()
+        for k, (t, src, dst, size) in enumerate(send_L):
+            sim.schedule(t, self.send, k, src, dst, size)
+        sim.run(None if settle is None else start + max([t for t, src, dst, size in send_L] + [0]) + settle)
+        return convergence, time.perf_counter() - wall, sim.now - start
+
+    ## run the benchmark with one thread per node, times are wall-clock seconds
+    # @param send_L: (send time, source host, destination host, size) of each
+    #   packet, the packets are sent as fast as possible regardless of the times
+    # @param timeout: seconds to wait for packets to be delivered
+    def run_threaded(self, send_L, timeout):
+        object_L = self.host_L + self.router_L + [self.link_layer]
+        thread_L = [threading.Thread(name=obj.__str__(), target=obj.run) for obj in object_L]
+        for t in thread_L:
+            t.start()
+        try:
+            wall = time.perf_counter()
+            self.start_routing()
+            convergence = {'time': self.wait_converged(timeout)}
+            convergence['wall_s'] = convergence['time']
+            wall = time.perf_counter()
+            for k, (t, src, dst, size) in enumerate(send_L):
+                self.send(k, src, dst, size)
+            while len(self.latency_L) < len(send_L) and time.perf_counter() - wall < timeout:
+                time.sleep(0.001)
+            elapsed = time.perf_counter() - wall
+        finally:
+            for obj in object_L:
+                obj.stop = True
+            for t in thread_L:
+                t.join()
+        return convergence, elapsed, elapsed
+
+    ## wait until every router has a route to every host and the routing
+    # tables stopped changing
+    # @return seconds from the start until the last routing table change seen
+    def wait_converged(self, timeout, settle=0.05):
+        start = time.perf_counter()
+        last_change, snapshot = start, None
+        while time.perf_counter() - start < timeout:
+            current = [dict(router.fib_D) for router in self.router_L]
+            now = time.perf_counter()
+            if current != snapshot:
+                snapshot, last_change = current, now
+            elif now - last_change > settle and all(router.fib_D.match(dst) is not None
+                                                    for router in self.router_L for dst in range(1, self.n + 1)):
+                break
+            time.sleep(0.001)
+        return last_change - start
+
+
+## nearest-rank percentiles of a list of numbers
+def percentiles(value_L):
+    if not value_L:
+        return None
+    value_L = sorted(value_L)
+    result_D = {}
+    for p in (50, 90, 99):
+        result_D['p%d' % p] = value_L[max(0, int(math.ceil(p / 100.0 * len(value_L))) - 1)]
+    result_D['max'] = value_L[-1]
+    return result_D
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulator throughput and latency benchmark')
+    parser.add_argument('--topology', choices=sorted(topology_D), default='line')
+    parser.add_argument('--routers', type=int, default=10)
+    parser.add_argument('--packets', type=int, default=1000)
+    parser.add_argument('--interval', type=float, default=0.1, help='virtual time between sends (event-driven mode)')
+    parser.add_argument('--traffic', help='JSON file with a list of traffic models (see traffic.py) to send instead of --packets packets at --interval')
+    parser.add_argument('--traffic-duration', type=float, default=100, help='virtual time to generate --traffic for')
+    parser.add_argument('--mode', choices=['event', 'threads'], default='event')
+    parser.add_argument('--queue-size', type=int, default=0, help='router queue length, 0 for unlimited')
+    parser.add_argument('--packet-pool', type=int, default=0, help='packet objects kept for reuse, 0 to allocate every packet')
+    parser.add_argument('--drop-policy', choices=['tail', 'head', 'red'], default='tail', help='what a full router queue drops')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait in threaded mode')
+    parser.add_argument('--protocol', choices=['distance_vector', 'link_state'], default='distance_vector')
+    parser.add_argument('--hold-down', type=float, default=0, help='minimum time between triggered routing updates')
+    parser.add_argument('--refresh-interval', type=float, default=0, help='time between periodic full routing updates, 0 for none')
+    parser.add_argument('--area-size', type=int, default=0, help='routers per area whose hosts are summarized to other areas, 0 for none (areas of random topologies may not be connected)')
+    parser.add_argument('--ecmp', action='store_true', help='spread flows over equal-cost next hops')
+    parser.add_argument('--seed-routes', action='store_true', help='compute the routing tables in bulk instead of converging (needs numpy)')
+    parser.add_argument('--check-routes', action='store_true', help='compare the routing tables with the shortest paths at the end (needs numpy)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write the JSON results to, default stdout')
+    args = parser.parse_args(argv)
+    if args.check_routes and args.area_size:
+        parser.error('--check-routes does not model the route summaries of --area-size')
+
+    #with bounded queues packets are dropped by the thousand, they are counted in the results instead
+    tracing.configure(logging.ERROR if args.queue_size else logging.WARNING)
+    interface.Interface.drop_policy = args.drop_policy
+    network_2.NetworkPacket.pool_size = args.packet_pool
+    rng = random.Random(args.seed)
+    build_wall = time.perf_counter()
+    routing_D = {'protocol': args.protocol, 'hold_down': args.hold_down, 'refresh_interval': args.refresh_interval,
+                 'ecmp': args.ecmp}
+    bench = Benchmark(topology_D[args.topology](args.routers, rng), args.routers, args.queue_size, routing_D, args.area_size)
+    build_wall = time.perf_counter() - build_wall
+    if args.traffic:
+        with open(args.traffic) as f:
+            generator = traffic.TrafficGenerator({host.addr: host for host in bench.host_L}, json.load(f), args.traffic_duration, args.seed)
+        send_L = generator.sends()
+    else:
+        send_L = []
+        for k in range(args.packets):
+            src = rng.randrange(args.routers) + 1
+            dst = rng.randrange(args.routers - 1) + 1
+            send_L.append((k * args.interval, src, dst if dst < src else dst + 1, 0))
+
+    seed_wall = bench.seed_routes() if args.seed_routes else None
+    cpu = time.process_time()
+    if args.mode == 'event':
+        #periodic refreshes never let the simulator run out of events, give
+        #routing time to cross the network a few times instead
+        settle = 4 * args.routers if args.refresh_interval else None
+        convergence, wall, duration = bench.run_event_driven(send_L, settle)
+    else:
+        convergence, wall, duration = bench.run_threaded(send_L, args.timeout)
+    cpu = time.process_time() - cpu
+
+    result_D = {
+        'topology': args.topology,
+        'routers': args.routers,
+        'links': len(bench.link_layer.link_L),
+        'mode': args.mode,
+        'protocol': args.protocol,
+        'ecmp': args.ecmp,
+        'area_size': args.area_size,
+        'seed': args.seed,
+        'traffic': args.traffic,
+        'packets_sent': len(send_L),
+        'packets_delivered': len(bench.latency_L),
+        'build_wall_s': build_wall,
+        'seed_routes_wall_s': seed_wall,
+        'convergence': convergence,
+        'data_wall_s': wall,
+        'throughput_pps': len(bench.latency_L) / wall if wall > 0 else None,
+        'latency_time_unit': 'virtual' if args.mode == 'event' else 'seconds',
+        'latency_end_to_end': percentiles([latency for latency, hops in bench.latency_L]),
+        'latency_per_hop': percentiles([latency / hops for latency, hops in bench.latency_L if hops]),
+        'duration': duration,
+        'cpu_s': cpu,
+        'cpu_utilization': cpu / (convergence['wall_s'] + wall) if convergence['wall_s'] + wall > 0 else None,
+        'control_plane': metrics.control_plane(metrics.snapshot(bench.router_L)),
+        'routing_table_entries': sum(len(router.rt_tbl_D) for router in bench.router_L),
+        'queue_size': args.queue_size,
+        'drop_policy': args.drop_policy,
+        'packet_pool': args.packet_pool,
+        'drops': metrics.drops(metrics.snapshot(bench.host_L + bench.router_L)),
+        'busiest_interfaces': metrics.busiest(metrics.snapshot(bench.host_L + bench.router_L), 5),
+    }
+    if args.check_routes:
+        result_D['route_mismatches'] = len(apsp.ShortestPaths(bench.router_L, bench.link_layer).check())
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result_D, f, indent=2)
+    else:
+        json.dump(result_D, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
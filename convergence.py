@@ -0,0 +1,283 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Measures how routing reconverges after link cost changes and link
+failures: distance vector with and without split horizon and poison
+reverse, and link state. The topology file lists the changes as
+"cost_changes": [[router, interface, cost], ...] and "link_failures":
+[[router, interface], ...]; they are applied together once routing has
+converged, and the failed links are then restored, e.g.
+
+    python convergence.py topology_3.json
+    python convergence.py topology_4.json --traffic-interval 1
+    python convergence.py topology_5.json --traffic-interval 0.5
+
+With a traffic interval every host sends a packet to every other host at
+that interval around each change, and the packets lost are counted.
+
+    python convergence.py --check
+
+runs the built-in scenarios of check_L instead, each raising an exception
+if routing does not reconverge, or the links do not deliver, as they should.
+
+Times are in rounds: the virtual time of the discrete-event simulator, in
+which a link carries a packet per time unit.
+'''
+import network_2
+import link_2
+import async_sim
+import benchmark
+import event_sim
+import metrics
+import prefix
+import topology
+import tracing
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+## routing options compared by default
+mode_D = {
+    'plain': {},
+    'split_horizon': {'split_horizon': True},
+    'poison_reverse': {'poison_reverse': True},
+    'link_state': {'protocol': 'link_state'},
+}
+
+## simulate one routing mode
+# @param topo_D: topology description with cost_changes and link_failures
+# @param routing_D: routing options added to those of the topology
+# @param max_rounds: rounds to give routing after the change before giving up
+# @param traffic_interval: rounds between the packets each host sends to each
+#   other host while routing reconverges, 0 for no traffic
+# @param traffic_rounds: rounds to send the traffic for, the change is made halfway through
+# @return dict of results, with the results of restoring the failed links under 'restore'
+def measure(topo_D, routing_D, max_rounds, traffic_interval=0, traffic_rounds=20):
+    topo_D = dict(topo_D, routing=dict(topo_D.get('routing', {}), **routing_D))
+    topo = topology.Topology(topo_D, network_2, link_2)
+    sim = event_sim.EventSimulator(topo.link_layer, topo.object_L)
+    for router in topo.router_D.values():
+        router.send_routes()
+    sim.run()
+    failure_L = [topo.link(name, intf) for name, intf in topo_D.get('link_failures', [])]
+
+    def change():
+        for name, intf, cost in topo_D.get('cost_changes', []):
+            topo.router_D[name].set_cost(intf, cost)
+        for link in failure_L:
+            link.fail()
+
+    def restore():
+        for link in failure_L:
+            link.restore()
+
+    result_D = phase(topo, sim, change, max_rounds, traffic_interval, traffic_rounds)
+    if failure_L:
+        result_D['restore'] = phase(topo, sim, restore, max_rounds, traffic_interval, traffic_rounds)
+    return result_D
+
+
+## make a change to a converged network and measure how routing reconverges
+# @param topo: Topology being simulated
+# @param sim: its EventSimulator, with no events left
+# @param apply: function making the change
+# @param max_rounds, traffic_interval, traffic_rounds: see measure()
+# @return dict of results
+def phase(topo, sim, apply, max_rounds, traffic_interval, traffic_rounds):
+    router_L = list(topo.router_D.values())
+    host_L = list(topo.host_D.values())
+    initial_D = metrics.control_plane(metrics.snapshot(router_L))
+    initial_loss_D = loss(topo)
+    if traffic_interval:
+        for k in range(int(traffic_rounds / traffic_interval)):
+            for src in host_L:
+                for dst in host_L:
+                    if dst is not src:
+                        sim.schedule(k * traffic_interval, src.udt_send, dst.addr, src.addr, 'probe %d' % k)
+        #the change comes halfway through the traffic, with packets in flight
+        sim.run(sim.now + traffic_rounds / 2)
+    start = sim.now
+    apply()
+    sim.run(start + max_rounds)
+    final_D = metrics.control_plane(metrics.snapshot(router_L))
+    loss_D = {key: count - initial_loss_D[key] for key, count in loss(topo).items()}
+    converged = not sim.event_L
+    if not converged:
+        rounds = None
+    elif final_D['last_change'] is None or final_D['last_change'] < start:
+        rounds = 0 #no route changed
+    else:
+        rounds = final_D['last_change'] - start
+    return {'converged': converged,
+            'rounds': rounds,
+            'updates_sent': final_D['updates_sent'] - initial_D['updates_sent'],
+            'routes_sent': final_D['routes_sent'] - initial_D['routes_sent'],
+            'packets_sent': loss_D['sent'],
+            'packets_lost': loss_D['sent'] - loss_D['received'],
+            'lost_on_down_links': loss_D['link_down'],
+            'lost_without_route': loss_D['no_route'],
+            'routes': {router.name: {prefix.to_S(dst): min(intf_cost_D.values()) for dst, intf_cost_D in sorted(router.rt_tbl_D.items())}
+                       for router in router_L}}
+
+
+## data packet counters of a network, for counting the packets lost
+# @param topo: Topology being simulated
+# @return dict of counters
+def loss(topo):
+    host_L = [host.snapshot() for host in topo.host_D.values()]
+    router_L = [router.snapshot() for router in topo.router_D.values()]
+    return {'sent': sum(host_D['sent'] for host_D in host_L),
+            'received': sum(host_D['received'] for host_D in host_L),
+            'link_down': sum(link.lost for link in topo.link_layer.link_L),
+            'no_route': sum(router_D['no_route'] for router_D in router_L)}
+
+
+## cut a router off a random graph: distance vector counts the costs to its
+# host up around the loops of the graph, every mode must still withdraw the
+# host within max_rounds and route to it again once the links are restored
+# @param routers: number of routers of the random graph
+# @param seed: random seed of the graph
+# @param cut: router whose links fail
+# @param max_rounds: rounds routing is given to reconverge
+# @return {mode: {rounds, updates_sent, restore_rounds}}
+def check_partition(routers=16, seed=1, cut=4, max_rounds=500):
+    edge_L = benchmark.random_edges(routers, random.Random(seed))
+    topo_D = topology.from_edges(edge_L, routers)
+    #the links of a router are on interfaces 1.., in the order of its edges
+    intf_count = len([edge for edge in edge_L if cut in edge[:2]])
+    topo_D['link_failures'] = [[str(cut), intf] for intf in range(1, intf_count + 1)]
+    topo_D['routing'] = {'infinity': 200}
+    host = prefix.to_S(cut + 1)
+    summary_D = {}
+    for mode, routing_D in mode_D.items():
+        result_D = measure(topo_D, routing_D, max_rounds)
+        if not result_D['converged']:
+            raise Exception('partition, %s: routing has not converged after %s rounds' % (mode, max_rounds))
+        ghost_L = [name for name, route_D in result_D['routes'].items() if name != str(cut) and host in route_D]
+        if ghost_L:
+            raise Exception('partition, %s: routers %s still route to host %s' % (mode, ghost_L, host))
+        restore_D = result_D['restore']
+        lost_L = [name for name, route_D in restore_D['routes'].items() if host not in route_D]
+        if not restore_D['converged'] or lost_L:
+            raise Exception('partition, %s: routers %s have no route to host %s after the restore' % (mode, lost_L, host))
+        summary_D[mode] = {'rounds': result_D['rounds'], 'updates_sent': result_D['updates_sent'],
+                           'restore_rounds': restore_D['rounds']}
+    return summary_D
+
+
+## triggered updates held down after a link failure or a cost change must
+# still go out when they are due, when nothing else wakes the routers: on
+# topology_4.json every router sent its last update less than hold_down
+# before the change. The routes must end up as without hold_down.
+# @param max_rounds: rounds routing is given to reconverge
+# @return {change: {mode: {rounds, updates_sent}}}
+def check_hold_down(max_rounds=1000):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topology_4.json')) as f:
+        topo_D = json.load(f)
+    change_D = {
+        'link_failure': (dict(topo_D), 50),
+        'cost_change': (dict(topo_D, link_failures=[], cost_changes=[['A', 1, 9], ['B', 0, 9]]), 3),
+    }
+    summary_D = {}
+    for change, (change_topo_D, hold_down) in change_D.items():
+        summary_D[change] = {}
+        for mode, routing_D in mode_D.items():
+            expected_D = measure(change_topo_D, routing_D, max_rounds)
+            result_D = measure(change_topo_D, dict(routing_D, hold_down=hold_down), max_rounds)
+            if not result_D['converged']:
+                raise Exception('%s, %s: routing has not converged after %s rounds' % (change, mode, max_rounds))
+            if result_D['routes'] != expected_D['routes']:
+                raise Exception('%s, %s: the routes differ with hold_down %s' % (change, mode, hold_down))
+            if 'restore' in result_D and result_D['restore']['routes'] != expected_D['restore']['routes']:
+                raise Exception('%s, %s: the restored routes differ with hold_down %s' % (change, mode, hold_down))
+            summary_D[change][mode] = {'rounds': result_D['rounds'], 'updates_sent': result_D['updates_sent']}
+    return summary_D
+
+
+## a link whose bandwidth is below the length of a packet must still carry
+# every packet, paying the overshoot back out of later calls, in each runtime
+# @param packets: packets host 1 sends to host 2
+# @param timeout: seconds the threads are given to deliver them
+# @return {runtime: packets received}
+def check_bandwidth(packets=3, timeout=5):
+    option_D = {'batch_size': 10, 'bandwidth': 5}
+    topo_D = {'hosts': [1, 2],
+              'routers': [{'name': 'A', 'intf_cost_L': [1, 1]}],
+              'links': [[1, 0, 'A', 0, option_D], ['A', 1, 2, 0, option_D]]}
+    received_D = {}
+    for runtime in ('events', 'asyncio', 'threads'):
+        topo = topology.Topology(topo_D, network_2, link_2)
+        src, dst = topo.host_D[1], topo.host_D[2]
+
+        def send():
+            for k in range(packets):
+                src.udt_send(dst.addr, src.addr, ('probe %d' % k).ljust(20))
+
+        if runtime == 'events':
+            sim = event_sim.EventSimulator(topo.link_layer, topo.object_L)
+            send()
+            sim.run()
+        elif runtime == 'asyncio':
+            sim = async_sim.AsyncSimulator(topo.link_layer, topo.object_L)
+            send()
+            sim.run()
+            sim.stop()
+        else:
+            thread_L = [threading.Thread(name=obj.__str__(), target=obj.run) for obj in topo.object_L]
+            for t in thread_L:
+                t.start()
+            try:
+                send()
+                start = time.perf_counter()
+                while dst.snapshot()['received'] < packets and time.perf_counter() - start < timeout:
+                    time.sleep(0.001)
+            finally:
+                for obj in topo.object_L:
+                    obj.stop = True
+                for t in thread_L:
+                    t.join()
+        received_D[runtime] = dst.snapshot()['received']
+        if received_D[runtime] != packets:
+            raise Exception('bandwidth, %s: %d of %d packets delivered over links of bandwidth %d'
+                            % (runtime, received_D[runtime], packets, option_D['bandwidth']))
+    return received_D
+
+
+## scenarios run by --check
+check_L = [check_partition, check_hold_down, check_bandwidth]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Routing reconvergence after link cost changes and failures')
+    parser.add_argument('topology', nargs='?', help='topology file with cost_changes or link_failures')
+    parser.add_argument('--check', action='store_true', help='run the built-in scenarios instead of a topology file')
+    parser.add_argument('--modes', default=','.join(mode_D), help='comma separated routing modes to compare')
+    parser.add_argument('--max-rounds', type=float, default=10000)
+    parser.add_argument('--traffic-interval', type=float, default=0, help='rounds between probe packets, 0 for none')
+    parser.add_argument('--traffic-rounds', type=float, default=20, help='rounds to send probe packets for')
+    args = parser.parse_args(argv)
+    if args.topology is None and not args.check:
+        parser.error('a topology file or --check is required')
+
+    #lost probe packets are counted in the results rather than logged
+    tracing.configure(logging.ERROR)
+    if args.check:
+        json.dump({check.__name__: check() for check in check_L}, sys.stdout, indent=2)
+        print()
+        return
+    with open(args.topology) as f:
+        topo_D = json.load(f)
+    result_D = {mode: measure(topo_D, mode_D[mode], args.max_rounds, args.traffic_interval, args.traffic_rounds) for mode in args.modes.split(',')}
+    json.dump(result_D, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+import heapq
+
+## schedules a node or link handler when one of its watched interface queues
+# receives a packet (registered with Interface.watch in place of a Readiness)
+class Wakeup:
+
+    ##@param sim: EventSimulator to schedule the handler on
+    # @param handler: called with no arguments to service the queues
+    # @param delay: virtual time between a packet arriving and the handler running
+    # @param intf_L: list of (interface, in_or_out) pairs the handler services
+    # @param timer: Timer armed after each run of the handler, None for none
+    def __init__(self, sim, handler, delay, intf_L, timer=None):
+        self.sim = sim
+        self.handler = handler
+        self.delay = delay
+        self.intf_L = intf_L
+        self.timer = timer
+        self.scheduled = False
+        for intf, in_or_out in intf_L:
+            intf.watch(in_or_out, self)
+            #queueing delay is measured in virtual time
+            intf.clock = sim.clock
+
+    ## called by Interface.put
+    def notify(self):
+        if not self.scheduled:
+            self.scheduled = True
+            self.sim.schedule(self.delay, self.fire)
+
+    ## run the handler, and run it again after another delay while packets remain
+    def fire(self):
+        self.scheduled = False
+        self.handler()
+        if self.timer is not None:
+            self.timer.arm()
+        for intf, in_or_out in self.intf_L:
+            q = intf.in_queue if in_or_out == 'in' else intf.out_queue
+            if q.qsize() > 0:
+                self.notify()
+                return
+
+
+## runs a router's timers() (triggered and periodic routing updates) when
+# they are due in virtual time
+class Timer:
+
+    ##@param sim: EventSimulator to schedule the timers on
+    # @param timers: called with no arguments, returns the time it is next due or None
+    def __init__(self, sim, timers):
+        self.sim = sim
+        self.timers = timers
+        self.due = None #earliest time a fire is scheduled for
+        self.arm()
+
+    ## run the timers and schedule a fire for when they are next due
+    def arm(self):
+        due = self.timers()
+        if due is not None and (self.due is None or due < self.due):
+            self.due = due
+            self.sim.schedule(max(0, due - self.sim.now), self.fire)
+
+    ## called when a scheduled time is reached
+    def fire(self):
+        if self.due is not None and self.due <= self.sim.now:
+            self.due = None
+        self.arm()
+
+
+## Single-threaded discrete-event simulator. Replaces the one thread per
+# Host, Router and LinkLayer: every put into a watched interface queue
+# schedules the handler that empties it (Host.udt_receive,
+# Router.process_queues, Link.tx_pkt) at a later virtual time, and run()
+# returns as soon as there are no more events. Routers with a periodic
+# refresh_interval always have a timer event pending, so run them with until.
+class EventSimulator:
+
+    ##@param link_layer: LinkLayer whose links are driven by the simulator
+    # @param object_L: hosts and routers (other objects in the list are ignored)
+    # @param link_delay: virtual time for a link to carry one packet in each direction
+    # @param node_delay: virtual time for a host or router to process its queues
+    def __init__(self, link_layer, object_L, link_delay=1.0, node_delay=0.0):
+        self.now = 0.0
+        self.event_L = [] #heap of (time, sequence number, function, args)
+        self.seq = 0 #breaks ties between events scheduled for the same time, in FIFO order
+        #sequence numbers of arrivals are offset by this so they sort first, see arrive()
+        self.arrival_offset = 1 << 62
+        self.events_run = 0
+        for link in link_layer.link_L:
+            Wakeup(self, link.tx_pkt, link_delay,
+                   [(link.node_1.intf_L[link.node_1_intf], 'out'),
+                    (link.node_2.intf_L[link.node_2_intf], 'out')])
+        for obj in object_L:
+            if hasattr(obj, 'process_queues'):
+                timer = None
+                if hasattr(obj, 'timers'):
+                    #routing update timers run in virtual time
+                    obj.clock = self.clock
+                    timer = Timer(self, obj.timers)
+                    #updates held down outside a run of the handler, e.g. by Link.fail
+                    obj.arm_timers = timer.arm
+                Wakeup(self, obj.process_queues, node_delay, [(intf, 'in') for intf in obj.intf_L], timer)
+            elif hasattr(obj, 'udt_receive'):
+                Wakeup(self, obj.udt_receive, node_delay, [(intf, 'in') for intf in obj.intf_L])
+
+    ## called when printing the object
+    def __str__(self):
+        return 'EventSimulator'
+
+    ## current virtual time
+    def clock(self):
+        return self.now
+
+    ## schedule a function call
+    # @param delay: virtual time from now at which to call fn
+    # @param fn: function to call
+    # @param args: arguments for fn
+    def schedule(self, delay, fn, *args):
+        heapq.heappush(self.event_L, (self.now + delay, self.seq, fn, args))
+        self.seq += 1
+
+    ## schedule a packet arrival. Arrivals run before the other events of the
+    # same time, in the order they were scheduled, so what a node sees at a
+    # time does not depend on when its arrivals were scheduled
+    # @param delay, fn, args: see schedule
+    def arrive(self, delay, fn, *args):
+        heapq.heappush(self.event_L, (self.now + delay, self.seq - self.arrival_offset, fn, args))
+        self.seq += 1
+
+    ## process events in time order until none are left
+    # @param until: stop before the first event later than this virtual time, None to drain
+    # @param exclusive: also stop before the events at until
+    # @return the virtual time of the last event processed
+    def run(self, until=None, exclusive=False):
+        while self.event_L:
+            if until is not None and (self.event_L[0][0] > until or exclusive and self.event_L[0][0] == until):
+                self.now = until
+                break
+            self.now, _, fn, args = heapq.heappop(self.event_L)
+            fn(*args)
+            self.events_run += 1
+        return self.now
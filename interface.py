@@ -0,0 +1,392 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+import bisect
+import queue
+import random
+import threading
+import time
+from multiprocessing import shared_memory
+
+## readiness notification shared by all the interfaces one thread services
+# (a selector over several interface queues). Interfaces call notify() when a
+# packet is put into a watched queue; the servicing thread sleeps in wait()
+# instead of busy-polling its queues.
+class Readiness:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.notify_time = None #time of the first notify since the last wake-up
+        #wake-up latency statistics (seconds)
+        self.wakeups = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    ## signal that a watched queue may have become non-empty (or that the
+    # thread should check its stop flag)
+    def notify(self):
+        if self.notify_time is None:
+            self.notify_time = time.perf_counter()
+        self.event.set()
+
+    ## block until notified
+    # @param timeout - maximum time to sleep in seconds, None to sleep until notified
+    # @return True if woken by a notification, False on timeout
+    def wait(self, timeout=None):
+        woken = self.event.wait(timeout)
+        #clear before the caller drains its queues so a put racing with the
+        #drain is not lost: it sets the event again for the next wait
+        self.event.clear()
+        if woken and self.notify_time is not None:
+            latency = time.perf_counter() - self.notify_time
+            self.notify_time = None
+            self.wakeups += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+        return woken
+
+    ## wake-up latency report for thread termination messages
+    def latency_S(self):
+        if self.wakeups == 0:
+            return '0 wake-ups'
+        return '%d wake-ups, wake-up latency mean %.1f us, max %.1f us' % \
+            (self.wakeups, self.latency_total / self.wakeups * 1e6, self.latency_max * 1e6)
+
+
+## packet counters of one interface queue
+class QueueStats:
+    ## upper bounds of the queueing delay histogram buckets (in clock units,
+    # seconds by default), the last bucket counts longer delays
+    delay_bound_L = [1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1, 10, 100]
+
+    #counters start at the class defaults so building thousands of interfaces
+    #stays cheap; the first update gives the instance its own value
+    enqueued = 0
+    dequeued = 0
+    bytes_enqueued = 0
+    bytes_dequeued = 0
+    dropped = 0 #packets dropped by the drop policy, the sum of the three below
+    tail_drops = 0 #arriving packets refused because the queue was full
+    head_drops = 0 #oldest packets discarded to make room for arriving ones
+    early_drops = 0 #arriving packets dropped early by random early detection
+    high_water = 0 #longest the queue has been
+    avg_qsize = 0.0 #moving average of the queue length, for random early detection
+    delay_hist_L = None #allocated on the first dequeue
+
+    ## record a packet taken off the queue
+    # @param length: packet length in bytes
+    # @param delay: time the packet spent in the queue
+    def dequeue(self, length, delay):
+        self.dequeued += 1
+        self.bytes_dequeued += length
+        if self.delay_hist_L is None:
+            self.delay_hist_L = [0] * (len(self.delay_bound_L) + 1)
+        self.delay_hist_L[bisect.bisect_left(self.delay_bound_L, delay)] += 1
+
+    ## copy of the counters
+    def snapshot(self):
+        return {'enqueued': self.enqueued, 'dequeued': self.dequeued,
+                'bytes_enqueued': self.bytes_enqueued, 'bytes_dequeued': self.bytes_dequeued,
+                'dropped': self.dropped, 'tail_drops': self.tail_drops,
+                'head_drops': self.head_drops, 'early_drops': self.early_drops,
+                'high_water': self.high_water,
+                'delay_bound_L': self.delay_bound_L,
+                'delay_hist_L': list(self.delay_hist_L or [0] * (len(self.delay_bound_L) + 1))}
+
+
+## preallocated ring buffer of encoded packets, a replacement for queue.Queue
+# in Interface (same put, get and qsize calls) that does not allocate per
+# packet beyond the bytes handed out by get. A packet takes as many
+# consecutive fixed-size slots as it needs. Like queue.Queue, the buffer holds
+# at most maxsize packets, or any number if maxsize is 0; a private buffer
+# doubles its slots when a packet does not fit. The buffer can instead live in
+# multiprocessing shared memory so that the producer and the consumer may be
+# in different processes; it then has a fixed size, refuses packets that do
+# not fit with queue.Full and supports a single producer and a single
+# consumer, since the lock only serializes the calls made in one process.
+class RingBuffer:
+    ## the buffer holds 4 counters (tail slot and packets put, written by the
+    # producer, head slot and packets got, written by the consumer), then the
+    # enqueue time and the packet length of each slot, then the slot data;
+    # it is accessed through typed memoryviews rather than struct calls
+    skip_length = 0xFFFFFFFF #length marking unused slots at the end of the buffer
+    default_slots = 64
+    default_slot_size = 64
+
+    ##@param slots: number of slots, the initial number for a private buffer
+    # @param slot_size: data bytes per slot
+    # @param name: shared memory block name, None for a private buffer
+    # @param create: create the shared memory block rather than attach to it
+    # @param maxsize: most packets held, 0 for no limit
+    def __init__(self, slots=default_slots, slot_size=default_slot_size, name=None, create=True, maxsize=0):
+        self.slot_size = slot_size
+        self.maxsize = maxsize
+        self.shm = None
+        #serializes the calls made in this process, so that a producer can
+        #grow a private buffer under the consumer
+        self.lock = threading.Lock()
+        self.allocate(slots, name, create)
+
+    ## allocate the counters, slot tables and slot data
+    # @param slots: number of slots
+    # @param name, create: see __init__
+    def allocate(self, slots, name=None, create=True):
+        self.slots = slots
+        time_start = 4 * 8
+        length_start = time_start + slots * 8
+        data_start = length_start + slots * 4
+        size = data_start + slots * self.slot_size
+        if name is None:
+            buf = memoryview(bytearray(size))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+            buf = self.shm.buf
+            if create:
+                buf[:time_start] = bytes(time_start)
+        self.counter_L = buf[:time_start].cast('Q')
+        self.time_L = buf[time_start:length_start].cast('d')
+        self.length_L = buf[length_start:data_start].cast('I')
+        self.data = buf[data_start:]
+
+    ## number of packets in the buffer
+    def qsize(self):
+        return self.counter_L[1] - self.counter_L[3]
+
+    ## add a packet
+    # @param item: (enqueue time, packet) as put by Interface; a packet object
+    #   is encoded, the buffer holds bytes only
+    # @param block: if True, wait for room, if False raise queue.Full
+    # @raise queue.Full if there is no room, or if the packet can never fit a shared buffer
+    def put(self, item, block=True):
+        enqueue_time, pkt = item
+        pkt_S = pkt.to_byte_S() if hasattr(pkt, 'to_byte_S') else pkt
+        need = -(-len(pkt_S) // self.slot_size) or 1
+        while True:
+            with self.lock:
+                if self.maxsize <= 0 or self.qsize() < self.maxsize:
+                    if self.room(need):
+                        self.store(enqueue_time, pkt_S, need)
+                        return
+                    if self.shm is None:
+                        self.grow(need)
+                        self.store(enqueue_time, pkt_S, need)
+                        return
+                    if need > self.slots:
+                        raise queue.Full
+            #the lock is released while waiting so that the consumer can make room
+            if not block:
+                raise queue.Full
+            time.sleep(0.0001)
+
+    ## whether a packet of need slots fits after the tail
+    def room(self, need):
+        counter_L, slots = self.counter_L, self.slots
+        index = counter_L[0] % slots
+        #a packet does not wrap around, the slots left at the end are skipped
+        skip = slots - index if index + need > slots else 0
+        return counter_L[0] + skip + need - counter_L[2] <= slots
+
+    ## write a packet at the tail, there must be room for it
+    def store(self, enqueue_time, pkt_S, need):
+        counter_L, slots, slot_size = self.counter_L, self.slots, self.slot_size
+        tail = counter_L[0]
+        index = tail % slots
+        skip = slots - index if index + need > slots else 0
+        if skip:
+            self.length_L[index] = self.skip_length
+            index = 0
+        self.time_L[index] = enqueue_time
+        self.length_L[index] = len(pkt_S)
+        start = index * slot_size
+        self.data[start : start + len(pkt_S)] = pkt_S
+        #publish the packet only after it is written
+        counter_L[0] = tail + skip + need
+        counter_L[1] += 1
+
+    ## move the packets of a private buffer into one with at least twice the
+    # slots and room for another packet of need slots
+    def grow(self, need):
+        item_L = []
+        while self.qsize():
+            item_L.append(self.take())
+        used = need + sum(-(-len(pkt_S) // self.slot_size) or 1 for enqueue_time, pkt_S in item_L)
+        slots = 2 * self.slots
+        while slots < used:
+            slots *= 2
+        self.allocate(slots)
+        for enqueue_time, pkt_S in item_L:
+            self.store(enqueue_time, pkt_S, -(-len(pkt_S) // self.slot_size) or 1)
+
+    ## take the oldest packet
+    # @param block: ignored, an empty buffer always raises queue.Empty
+    # @return (enqueue time, packet bytes)
+    def get(self, block=False):
+        with self.lock:
+            return self.take()
+
+    ## take the oldest packet, see get
+    def take(self):
+        counter_L, length_L, slots, slot_size = self.counter_L, self.length_L, self.slots, self.slot_size
+        gets = counter_L[3]
+        if gets == counter_L[1]:
+            raise queue.Empty
+        head = counter_L[2]
+        index = head % slots
+        length = length_L[index]
+        if length == self.skip_length:
+            head += slots - index
+            index = 0
+            length = length_L[0]
+        start = index * slot_size
+        item = (self.time_L[index], self.data[start : start + length].tobytes())
+        counter_L[2] = head + (-(-length // slot_size) or 1)
+        counter_L[3] = gets + 1
+        return item
+
+    ## detach from the shared memory block
+    def close(self):
+        if self.shm is not None:
+            for view in (self.counter_L, self.time_L, self.length_L, self.data):
+                view.release()
+            self.shm.close()
+
+    ## free the shared memory block, called once by its creator after close()
+    def unlink(self):
+        if self.shm is not None:
+            self.shm.unlink()
+
+
+## wrapper class for a queue of packets
+class Interface:
+    ## queue implementation, 'queue' for queue.Queue or 'ring' for a RingBuffer,
+    # both holding up to maxsize packets
+    backend = 'queue'
+    ## what a bounded queue does with a packet that arrives when it is full:
+    # 'tail' drops the arriving packet, 'head' drops the oldest queued packet
+    # to make room, 'red' (random early detection) also drops arriving packets
+    # at random before the queue fills, more often the longer it is on average
+    drop_policy = 'tail'
+    ## random early detection parameters: no early drops below red_min_fill of
+    # maxsize average queue length, every packet dropped above red_max_fill,
+    # in between a drop probability growing to red_max_p; the average is an
+    # exponential moving average with weight red_weight per arriving packet
+    red_min_fill = 0.25
+    red_max_fill = 0.75
+    red_max_p = 0.1
+    red_weight = 0.2
+    ## random numbers of random early detection, seeded for repeatable runs
+    red_rng = random.Random(0)
+
+    ## @param maxsize - the maximum size of the queue storing packets
+    #  @param cost - of the interface used in routing
+    #  @param drop_policy - 'tail', 'head' or 'red', None for Interface.drop_policy
+    def __init__(self, cost=0, maxsize=0, drop_policy=None):
+        if drop_policy is not None:
+            self.drop_policy = drop_policy
+        if self.drop_policy not in ('tail', 'head', 'red'):
+            raise Exception('Interface: unknown drop policy %s' % self.drop_policy)
+        self.maxsize = maxsize
+        if self.backend == 'ring':
+            self.in_queue = RingBuffer(maxsize=maxsize)
+            self.out_queue = RingBuffer(maxsize=maxsize)
+        #unbounded queues use the lighter SimpleQueue, which matters when
+        #building topologies with thousands of interfaces
+        elif maxsize > 0:
+            self.in_queue = queue.Queue(maxsize);
+            self.out_queue = queue.Queue(maxsize);
+        else:
+            self.in_queue = queue.SimpleQueue();
+            self.out_queue = queue.SimpleQueue();
+        self.cost = cost
+        #False while the link on this interface is down
+        self.up = True
+        #readiness objects notified on put, per direction
+        self.in_watch_L = []
+        self.out_watch_L = []
+        #counters per direction and the clock used to time queueing delay
+        self.in_stats = QueueStats()
+        self.out_stats = QueueStats()
+        self.clock = time.perf_counter
+
+    ##register a readiness object to be notified when a packet is put into a queue
+    # @param in_or_out - which queue to watch
+    # @param readiness - Readiness object of the servicing thread
+    def watch(self, in_or_out, readiness):
+        if in_or_out == 'in':
+            self.in_watch_L.append(readiness)
+        else:
+            self.out_watch_L.append(readiness)
+
+    ##get packet from the queue interface
+    def get(self, in_or_out):
+        if in_or_out == 'in':
+            q, stats = self.in_queue, self.in_stats
+        else:
+            q, stats = self.out_queue, self.out_stats
+        try:
+            enqueue_time, pkt = q.get(False)
+        except queue.Empty:
+            return None
+        stats.dequeue(len(pkt), self.clock() - enqueue_time)
+        return pkt
+
+    ##put the packet into the interface queue; a full bounded queue drops a
+    # packet according to drop_policy
+    # @param pkt - Packet to be inserted into the queue
+    # @param block - with the 'tail' policy, if True block until room in queue,
+    #   if False throw queue.Full; the other policies never block
+    # @raise queue.Full if pkt was dropped
+    def put(self, pkt, in_or_out, block=False):
+        if in_or_out == 'out':
+            q, stats, watch_L = self.out_queue, self.out_stats, self.out_watch_L
+        else:
+            q, stats, watch_L = self.in_queue, self.in_stats, self.in_watch_L
+        if self.maxsize > 0 and self.drop_policy != 'tail':
+            if self.drop_policy == 'red':
+                self.early_drop(q, stats)
+            else:
+                self.head_drop(q, stats)
+            block = False
+        try:
+            q.put((self.clock(), pkt), block)
+        except queue.Full:
+            stats.dropped += 1
+            stats.tail_drops += 1
+            raise
+        stats.enqueued += 1
+        stats.bytes_enqueued += len(pkt)
+        stats.high_water = max(stats.high_water, q.qsize())
+        for readiness in watch_L:
+            readiness.notify()
+
+    ## random early detection: update the average queue length and drop the
+    # arriving packet with a probability growing with it
+    # @raise queue.Full if the packet is dropped
+    def early_drop(self, q, stats):
+        avg = stats.avg_qsize = (1 - self.red_weight) * stats.avg_qsize + self.red_weight * q.qsize()
+        min_avg = self.red_min_fill * self.maxsize
+        max_avg = self.red_max_fill * self.maxsize
+        if avg < min_avg:
+            return
+        if avg < max_avg and self.red_rng.random() >= self.red_max_p * (avg - min_avg) / (max_avg - min_avg):
+            return
+        stats.dropped += 1
+        stats.early_drops += 1
+        raise queue.Full
+
+    ## head drop: discard the oldest packets until there is room for one more
+    def head_drop(self, q, stats):
+        while q.qsize() >= self.maxsize:
+            try:
+                q.get(False)
+            except queue.Empty:
+                return #the consumer emptied the queue meanwhile
+            stats.dropped += 1
+            stats.head_drops += 1
+
+    ## counters of both queues, safe to call while the simulation runs
+    def snapshot(self):
+        return {'cost': self.cost, 'in': self.in_stats.snapshot(), 'out': self.out_stats.snapshot(),
+                'in_queued': self.in_queue.qsize(), 'out_queued': self.out_queue.qsize()}
@@ -4,8 +4,12 @@ Created on Oct 12, 2016
 @modified by: Megan Weller and Ashley Bertrand
 '''
 
+import logging
 import queue
 import threading
+import tracing
+from tracing import log
+from interface import Readiness
 
 ## An abstraction of a link between router interfaces
 class Link:
@@ -15,33 +19,105 @@ class Link:
     # @param node_1_intf: number of the interface on that node
     # @param node_2: node to which data will be transfered
     # @param node_2_intf: number of the interface on that node
-    def __init__(self, node_1, node_1_intf, node_2, node_2_intf):
+    # @param batch_size: maximum number of packets moved in each direction per tx_pkt call
+    # @param bandwidth: link capacity in bytes per tx_pkt call in each direction, 0 for no limit
+    def __init__(self, node_1, node_1_intf, node_2, node_2_intf, batch_size=1, bandwidth=0):
         self.node_1 = node_1
         self.node_1_intf = node_1_intf
         self.node_2 = node_2
         self.node_2_intf = node_2_intf
-        print('Created link %s' % self.__str__())
+        self.batch_size = batch_size
+        self.bandwidth = bandwidth
+        #interfaces are looked up once here rather than on every transmission
+        intf_1 = node_1.intf_L[node_1_intf]
+        intf_2 = node_2.intf_L[node_2_intf]
+        self.direction_L = [(intf_1, intf_2, node_1, node_1_intf, node_2, node_2_intf),
+                            (intf_2, intf_1, node_2, node_2_intf, node_1, node_1_intf)]
+        #bytes each direction may still send in this call, a packet that
+        #overshoots the bandwidth is paid back out of the next call
+        self.credit_L = [0, 0]
+        #False while the link is down, see fail()
+        self.up = True
+        #packets lost because they were sent while the link was down
+        self.lost = 0
+        log.info('Created link %s', self)
         
         
     ## called when printing the object
     def __str__(self):
         return 'Link %s-%d - %s-%d' % (self.node_1, self.node_1_intf, self.node_2, self.node_2_intf)
         
-    ##transmit a packet between interfaces in each direction
+    ##transmit a batch of packets between interfaces in each direction
+    # @return number of packets taken off the out queues, plus the number of
+    #   directions whose packets wait for bandwidth, so that the runtimes call
+    #   again rather than sleep while they pay back a packet longer than the bandwidth
     def tx_pkt(self):
-        for (node_a, node_a_intf, node_b, node_b_intf) in [(self.node_1, self.node_1_intf, self.node_2, self.node_2_intf), (self.node_2, self.node_2_intf, self.node_1, self.node_1_intf)]: 
-            intf_a = node_a.intf_L[node_a_intf]
-            intf_b = node_b.intf_L[node_b_intf]
-            pkt_S = intf_a.get('out')
-            if pkt_S is None:
-                continue #continue if no packet to transfer
-            #otherwise transmit the packet
-            try:
-                intf_b.put(pkt_S, 'in')
-                print('%s: transmitting packet "%s" on %s %s -> %s, %s' % (self, pkt_S, node_a, node_a_intf, node_b, node_b_intf))
-            except queue.Full:
-                print('%s: packet lost' % (self))
-                pass
+        transmitted = 0
+        waiting = 0 #directions with packets left for later calls
+        for d, (intf_a, intf_b, node_a, node_a_intf, node_b, node_b_intf) in enumerate(self.direction_L):
+            if self.bandwidth:
+                self.credit_L[d] = min(self.credit_L[d] + self.bandwidth, self.bandwidth)
+            for n in range(self.batch_size):
+                if self.bandwidth and self.credit_L[d] <= 0:
+                    if intf_a.out_queue.qsize() > 0:
+                        waiting += 1
+                    break #link capacity used up for this call
+                pkt = intf_a.get('out')
+                if pkt is None:
+                    break #no more packets to transfer in this direction
+                transmitted += 1
+                if not self.up:
+                    self.lost += 1
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug('%s: %d byte packet lost on the down link', self, len(pkt))
+                    if tracing.sink is not None:
+                        tracing.sink.record(tracing.DROP, self, node_a_intf, 0, len(pkt))
+                    continue
+                if self.bandwidth:
+                    self.credit_L[d] -= len(pkt)
+                #otherwise transmit the packet
+                try:
+                    intf_b.put(pkt, 'in')
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug('%s: transmitting %d byte packet on %s %s -> %s, %s', self, len(pkt), node_a, node_a_intf, node_b, node_b_intf)
+                    if tracing.sink is not None:
+                        tracing.sink.record(tracing.TRANSMIT, self, node_a_intf, 0, len(pkt))
+                except queue.Full:
+                    log.warning('%s: packet lost', self)
+                    if tracing.sink is not None:
+                        tracing.sink.record(tracing.DROP, self, node_a_intf, 0, len(pkt))
+        return transmitted + waiting
+
+    ## take the link down: packets queued on it or sent into it are lost, and
+    # the routers at either end are told so they can route around it
+    # (as with Router.set_cost, call it between runs or, in the event-driven
+    # runtimes, from a scheduled event rather than while node threads run)
+    def fail(self):
+        self.up = False
+        log.info('%s: down', self)
+        for node, intf in [(self.node_1, self.node_1_intf), (self.node_2, self.node_2_intf)]:
+            node.intf_L[intf].up = False
+            if hasattr(node, 'link_down'):
+                node.link_down(intf)
+
+    ## bring the link back up after fail()
+    def restore(self):
+        self.up = True
+        log.info('%s: up', self)
+        for node, intf in [(self.node_1, self.node_1_intf), (self.node_2, self.node_2_intf)]:
+            node.intf_L[intf].up = True
+            if hasattr(node, 'link_up'):
+                node.link_up(intf)
+
+    ## change the cost of the link in both directions, the routers at either
+    # end update their routes
+    # @param cost New cost of sending over the link
+    def set_cost(self, cost):
+        for node, intf in [(self.node_1, self.node_1_intf), (self.node_2, self.node_2_intf)]:
+            if hasattr(node, 'set_cost'):
+                node.set_cost(intf, cost)
+            else:
+                node.intf_L[intf].cost = cost
         
         
 ## An abstraction of the link layer
@@ -50,8 +126,20 @@ class LinkLayer:
     def __init__(self):
         ## list of links in the network
         self.link_L = []
-        self.stop = False #for thread termination
+        #wake the link layer thread when a packet is put into any out queue
+        self.readiness = Readiness()
+        self._stop = False #for thread termination
         
+    ## thread termination flag, setting it wakes up the thread
+    @property
+    def stop(self):
+        return self._stop
+
+    @stop.setter
+    def stop(self, stop):
+        self._stop = stop
+        self.readiness.notify()
+
     ## called when printing the object
     def __str__(self):
         return 'Network'
@@ -59,19 +147,27 @@ class LinkLayer:
     ##add a Link to the network
     def add_link(self, link):
         self.link_L.append(link)
+        link.node_1.intf_L[link.node_1_intf].watch('out', self.readiness)
+        link.node_2.intf_L[link.node_2_intf].watch('out', self.readiness)
         
-    ##transfer a packet across all links
+    ##transfer a batch of packets across all links
+    # @return number of packets transferred, more than 0 while any wait for bandwidth
     def transfer(self):
+        transferred = 0
         for link in self.link_L:
-            link.tx_pkt()
+            transferred += link.tx_pkt()
+        return transferred
                 
     ## thread target for the network to keep transmitting data across links
     def run(self):
-        print (threading.currentThread().getName() + ': Starting')
+        log.info('%s: Starting', threading.currentThread().getName())
         while True:
-            #transfer one packet on all the links
-            self.transfer()
+            #transfer packets on all the links until the out queues are drained
+            while self.transfer() > 0:
+                pass
             #terminate
             if self.stop:
-                print (threading.currentThread().getName() + ': Ending')
-                return
\ No newline at end of file
+                log.info('%s: Ending (%s)', threading.currentThread().getName(), self.readiness.latency_S())
+                return
+            #sleep until a packet is sent on some link or stop is set
+            self.readiness.wait()
\ No newline at end of file
@@ -0,0 +1,50 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+
+## counters of every host and router, can be polled while the simulation runs
+# @param object_L: simulation objects, those without a snapshot() method are skipped
+# @return {object name: snapshot}
+def snapshot(object_L):
+    return {str(obj): obj.snapshot() for obj in object_L if hasattr(obj, 'snapshot')}
+
+## routing protocol cost and convergence, summed over the routers
+# @param snapshot_D: result of snapshot()
+# @return {'updates_sent', 'routes_sent', 'control_bytes_sent', 'last_change'}, where
+#   last_change is the time of the last routing table change anywhere (the
+#   convergence time when the routing protocol started at time 0)
+def control_plane(snapshot_D):
+    result_D = {'updates_sent': 0, 'routes_sent': 0, 'control_bytes_sent': 0, 'last_change': None}
+    for node_D in snapshot_D.values():
+        if 'updates_sent' not in node_D:
+            continue #hosts do not route
+        for key in ('updates_sent', 'routes_sent', 'control_bytes_sent'):
+            result_D[key] += node_D[key]
+        if node_D['last_change'] is not None and (result_D['last_change'] is None or node_D['last_change'] > result_D['last_change']):
+            result_D['last_change'] = node_D['last_change']
+    return result_D
+
+## interfaces that came closest to saturating, by the out queue high-water mark
+# @param snapshot_D: result of snapshot()
+# @param n: number of interfaces to return
+# @return list of (object name, interface number, out high-water mark, out packets dropped)
+def busiest(snapshot_D, n=10):
+    intf_L = []
+    for name, node_D in snapshot_D.items():
+        for i, intf_D in enumerate(node_D['intf_L']):
+            intf_L.append((name, i, intf_D['out']['high_water'], intf_D['out']['dropped']))
+    intf_L.sort(key=lambda intf: (intf[2], intf[3]), reverse=True)
+    return intf_L[:n]
+
+## packets dropped by the interface queues, by drop policy
+# @param snapshot_D: result of snapshot()
+# @return {'tail_drops', 'head_drops', 'early_drops', 'dropped'}, where dropped is the total
+def drops(snapshot_D):
+    result_D = {'tail_drops': 0, 'head_drops': 0, 'early_drops': 0, 'dropped': 0}
+    for node_D in snapshot_D.values():
+        for intf_D in node_D['intf_L']:
+            for key in result_D:
+                result_D[key] += intf_D['in'][key] + intf_D['out'][key]
+    return result_D
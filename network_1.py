@@ -6,46 +6,11 @@ Created on Oct 12, 2016
 import queue
 import threading
 import ast
+from interface import Interface
 
 #keep track if message received is an update to routing table
 new_update = True
 
-## wrapper class for a queue of packets
-class Interface:
-    ## @param maxsize - the maximum size of the queue storing packets
-    #  @param cost - of the interface used in routing
-    def __init__(self, cost=0, maxsize=0):
-        self.in_queue = queue.Queue(maxsize);
-        self.out_queue = queue.Queue(maxsize);
-        self.cost = cost
-    
-    ##get packet from the queue interface
-    def get(self, in_or_out):
-        try:
-            if in_or_out == 'in':
-                pkt_S = self.in_queue.get(False)
-#                 if pkt_S is not None:
-#                     print('getting packet from the IN queue')
-                return pkt_S
-            else:
-                pkt_S = self.out_queue.get(False)
-#                 if pkt_S is not None:
-#                     print('getting packet from the OUT queue')
-                return pkt_S
-        except queue.Empty:
-            return None
-        
-    ##put the packet into the interface queue
-    # @param pkt - Packet to be inserted into the queue
-    # @param block - if True, block until room in queue, if False may throw queue.Full exception
-    def put(self, pkt, in_or_out, block=False):
-        if in_or_out == 'out':
-#             print('putting packet in the OUT queue')
-            self.out_queue.put(pkt, block)
-        else:
-#             print('putting packet in the IN queue')
-            self.in_queue.put(pkt, block)
-        
 ## Implements a network layer packet (different from the RDT packet 
 # from programming assignment 2).
 # NOTE: This class will need to be extended to for the packet to include
@@ -5,100 +5,108 @@ Created on Oct 12, 2016
 '''
 import queue
 import threading
-import ast
-
-#keep track if message received is an update to routing table
-new_update_A = True
-new_update_D = True
-
-## wrapper class for a queue of packets
-class Interface:
-    ## @param maxsize - the maximum size of the queue storing packets
-    #  @param cost - of the interface used in routing
-    def __init__(self, cost=0, maxsize=0):
-        self.in_queue = queue.Queue(maxsize);
-        self.out_queue = queue.Queue(maxsize);
-        self.cost = cost
-    
-    ##get packet from the queue interface
-    def get(self, in_or_out):
-        try:
-            if in_or_out == 'in':
-                pkt_S = self.in_queue.get(False)
-#                 if pkt_S is not None:
-#                     print('getting packet from the IN queue')
-                return pkt_S
-            else:
-                pkt_S = self.out_queue.get(False)
-#                 if pkt_S is not None:
-#                     print('getting packet from the OUT queue')
-                return pkt_S
-        except queue.Empty:
-            return None
-        
-    ##put the packet into the interface queue
-    # @param pkt - Packet to be inserted into the queue
-    # @param block - if True, block until room in queue, if False may throw queue.Full exception
-    def put(self, pkt, in_or_out, block=False):
-        if in_or_out == 'out':
-#             print('putting packet in the OUT queue')
-            self.out_queue.put(pkt, block)
-        else:
-#             print('putting packet in the IN queue')
-            self.in_queue.put(pkt, block)
-        
+import struct
+import time
+import zlib
+import tracing
+from tracing import log
+from interface import Interface, Readiness
+from routing import DistanceVector, LinkState
+import prefix
+
 ## Implements a network layer packet (different from the RDT packet 
 # from programming assignment 2).
 # NOTE: This class will need to be extended to for the packet to include
 # the fields necessary for the completion of this assignment.
 class NetworkPacket:
-    ## packet encoding lengths 
-    dst_addr_S_length = 5
-    prot_S_length = 1
-    source_length = 1
+    ## fixed packet header: destination address, protocol code, source address, payload length
+    header = struct.Struct('!IBII')
+    ## protocol codes carried in the header
+    prot_code_D = {'data': 1, 'control': 2, 'link_state': 3}
+    prot_S_D = {1: 'data', 2: 'control', 3: 'link_state'}
+    #no per-packet __dict__, packets are the most numerous objects of a simulation
+    __slots__ = ('dst_addr', 'prot_S', 'source', 'payload')
+    ## free list of packet objects for make() to reuse, filled by release()
+    pool_L = []
+    ## most packet objects kept in pool_L, 0 to not reuse packet objects
+    pool_size = 0
     
     ##@param dst_addr: address of the destination host
-    # @param data_S: packet payload
+    # @param data_S: packet payload, a string or a bytes-like object
     # @param prot_S: upper layer protocol for the packet (data, or control)
     # @param source: source of the packet, where it was originally sent from
     def __init__(self, dst_addr, prot_S, source, data_S):
         self.dst_addr = dst_addr
         self.prot_S = prot_S
         self.source = source
-        self.data_S = data_S
+        if isinstance(data_S, str):
+            data_S = data_S.encode()
+        self.payload = data_S
+
+    ## a packet from the free list, or a new one if it is empty; takes the
+    # arguments of __init__
+    @classmethod
+    def make(self, dst_addr, prot_S, source, data_S):
+        try:
+            p = self.pool_L.pop()
+        except IndexError:
+            return self(dst_addr, prot_S, source, data_S)
+        p.dst_addr = dst_addr
+        p.prot_S = prot_S
+        p.source = source
+        p.payload = data_S.encode() if isinstance(data_S, str) else data_S
+        return p
+
+    ## return the packet to the free list once nothing refers to it any more
+    def release(self):
+        if len(self.pool_L) < self.pool_size:
+            self.payload = None #do not keep the buffer of a payload view alive
+            self.pool_L.append(self)
         
+    ## packet payload as a string
+    @property
+    def data_S(self):
+        return str(self.payload, 'utf-8')
+
     ## called when printing the object
     def __str__(self):
-        return self.to_byte_S()
+        if self.prot_S == 'control':
+            return '%05d%d%d%s' % (self.dst_addr, self.prot_code_D[self.prot_S], self.source, Message.from_byte_S(self.payload))
+        if self.prot_S == 'link_state':
+            return '%05d%d%d%s' % (self.dst_addr, self.prot_code_D[self.prot_S], self.source, LinkStateMessage.from_byte_S(self.payload))
+        return '%05d%d%d%s' % (self.dst_addr, self.prot_code_D[self.prot_S], self.source, self.data_S)
         
     ## convert packet to a byte string for transmission over links
     def to_byte_S(self):
-        byte_S = str(self.dst_addr).zfill(self.dst_addr_S_length)
-        if self.prot_S == 'data':
-            byte_S += '1'
-        elif self.prot_S == 'control':
-            byte_S += '2'
-        else:
-            raise('%s: unknown prot_S option: %s' %(self, self.prot_S))
-        byte_S += str(self.source)
-        byte_S += self.data_S
-        return byte_S
+        if self.prot_S not in self.prot_code_D:
+            raise Exception('%s: unknown prot_S option: %s' %(self, self.prot_S))
+        return self.header.pack(self.dst_addr, self.prot_code_D[self.prot_S], self.source, len(self.payload)) + self.payload
     
-    ## extract a packet object from a byte string
+    ## length of the packet once encoded, for the byte counts of queues, links and traces
+    def __len__(self):
+        return self.header.size + len(self.payload)
+
+    ## packet object of a packet taken off an interface. Hosts and routers in
+    # one process hand each other packet objects; packets are only encoded
+    # where they leave the process's objects, in a ring buffer or on the way
+    # to another shard, and arrive as byte strings from there
+    # @param pkt: NetworkPacket or byte string representation of the packet
+    @classmethod
+    def of(self, pkt):
+        if isinstance(pkt, self):
+            return pkt
+        return self.from_byte_S(pkt)
+
+    ## extract a packet object from a byte string, the payload is a view
+    # into byte_S rather than a copy
     # @param byte_S: byte string representation of the packet
     @classmethod
     def from_byte_S(self, byte_S):
-        dst_addr = int(byte_S[0 : NetworkPacket.dst_addr_S_length])
-        prot_S = byte_S[NetworkPacket.dst_addr_S_length : NetworkPacket.dst_addr_S_length + NetworkPacket.prot_S_length]
-        if prot_S == '1':
-            prot_S = 'data'
-        elif prot_S == '2':
-            prot_S = 'control'
-        else:
-            raise('%s: unknown prot_S field: %s' %(self, prot_S))
-        source = byte_S[NetworkPacket.dst_addr_S_length + NetworkPacket.prot_S_length : NetworkPacket.dst_addr_S_length + NetworkPacket.prot_S_length + NetworkPacket.source_length]
-        data_S = byte_S[NetworkPacket.dst_addr_S_length + NetworkPacket.prot_S_length + NetworkPacket.source_length : ]        
-        return self(dst_addr, prot_S, source, data_S)
+        dst_addr, prot, source, length = self.header.unpack_from(byte_S)
+        if prot not in self.prot_S_D:
+            raise Exception('%s: unknown prot_S field: %s' %(self, prot))
+        payload = memoryview(byte_S)[self.header.size : self.header.size + length]
+        return self.make(dst_addr, self.prot_S_D[prot], source, payload)
 
 ## Implements a network host for receiving and transmitting data
 class Host:
@@ -107,36 +115,70 @@ class Host:
     def __init__(self, addr):
         self.addr = addr
         self.intf_L = [Interface()]
-        self.stop = False #for thread termination
+        #wake the host thread when a packet arrives
+        self.readiness = Readiness()
+        self.intf_L[0].watch('in', self.readiness)
+        #data packet counters, see snapshot()
+        self.counter_D = {'sent': 0, 'received': 0}
+        self._stop = False #for thread termination
     
+    ## thread termination flag, setting it wakes up the thread
+    @property
+    def stop(self):
+        return self._stop
+
+    @stop.setter
+    def stop(self, stop):
+        self._stop = stop
+        self.readiness.notify()
+
     ## called when printing the object
     def __str__(self):
         return 'Host_%s' % (self.addr)
+
+    ## copy of the host and interface counters, safe to call while the simulation runs
+    def snapshot(self):
+        return dict(self.counter_D, intf_L=[intf.snapshot() for intf in self.intf_L])
        
     ## create a packet and enqueue for transmission
     # @param dst_addr: destination address for the packet
     # @param data_S: data being transmitted to the network layer
     def udt_send(self, dst_addr, source, data_S):
-        p = NetworkPacket(dst_addr, 'data', source, data_S)
-        print('%s: sending packet "%s"' % (self, p))
-        self.intf_L[0].put(p.to_byte_S(), 'out') #send packets always enqueued successfully
+        p = NetworkPacket.make(dst_addr, 'data', source, data_S)
+        log.debug('%s: sending packet "%s"', self, p)
+        if tracing.sink is not None:
+            tracing.sink.record(tracing.SEND, self, 0, dst_addr, len(p))
+        self.intf_L[0].put(p, 'out') #send packets always enqueued successfully
+        self.counter_D['sent'] += 1
         
     ## receive packet from the network layer
+    # @return the NetworkPacket received, None if there was none
     def udt_receive(self):
-        pkt_S = self.intf_L[0].get('in')
-        if pkt_S is not None:
-            print('%s: received packet "%s"' % (self, pkt_S))
+        pkt = self.intf_L[0].get('in')
+        if pkt is None:
+            return None
+        p = NetworkPacket.of(pkt)
+        #hosts do not take part in routing, routing updates are dropped
+        if p.prot_S == 'data':
+            self.counter_D['received'] += 1
+            log.debug('%s: received packet "%s"', self, p)
+            if tracing.sink is not None:
+                tracing.sink.record(tracing.RECEIVE, self, 0, p.dst_addr, len(p))
+        return p
        
     ## thread target for the host to keep receiving data
     def run(self):
-        print (threading.currentThread().getName() + ': Starting')
+        log.info('%s: Starting', threading.currentThread().getName())
         while True:
-            #receive data arriving to the in interface
-            self.udt_receive()
+            #receive all data arriving to the in interface
+            while self.udt_receive() is not None:
+                pass
             #terminate
             if(self.stop):
-                print (threading.currentThread().getName() + ': Ending')
+                log.info('%s: Ending (%s)', threading.currentThread().getName(), self.readiness.latency_S())
                 return
+            #sleep until a packet arrives or stop is set
+            self.readiness.wait()
 
 ## Implements a multi-interface router described in class
 class Router:
@@ -145,224 +187,518 @@ class Router:
     # @param intf_count: the number of input and output interfaces 
     # @param max_queue_size: max queue length (passed to Interface)
     # @param rt_tbl_D: routing table
-    # @param forwarding_table: forwarding table for the two paths
-    def __init__(self, name, intf_cost_L, rt_tbl_D, max_queue_size, forwarding_table):
-        self.stop = False #for thread termination
+    # @param hold_down: minimum time between triggered routing updates, changes in between are coalesced
+    # @param refresh_interval: time between periodic full routing updates, 0 for none
+    # @param split_horizon: leave routes out of the updates sent on the interface they were learned on
+    # @param poison_reverse: advertise those routes as unreachable instead of leaving them out
+    # @param infinity: cost at which a destination counts as unreachable, None for Message.infinity
+    # @param protocol: routing protocol, 'distance_vector' or 'link_state'
+    # @param ecmp: spread flows over all the equal-cost next hops rather than using one
+    # @param summary_D: prefixes to advertise on an interface in place of the routes
+    #   they cover {interface: [prefix, ...]}, prefixes written as in prefix.from_S
+    def __init__(self, name, intf_cost_L, rt_tbl_D, max_queue_size, hold_down=0, refresh_interval=0,
+                 split_horizon=False, poison_reverse=False, infinity=None, protocol='distance_vector', ecmp=False,
+                 summary_D=None):
+        self._stop = False #for thread termination
         self.name = name
         #create a list of interfaces
         #note the number of interfaces is set up by out_intf_cost_L
         self.intf_L = []
         for cost in intf_cost_L:
             self.intf_L.append(Interface(cost, max_queue_size))
+        #wake the router thread when a packet arrives on any interface
+        self.readiness = Readiness()
+        for intf in self.intf_L:
+            intf.watch('in', self.readiness)
+        #packet counters, see snapshot()
+        self.counter_D = {'forwarded': 0, 'no_route': 0, 'dropped': 0, 'updates_received': 0, 'updates_sent': 0,
+                          'routes_sent': 0, 'control_bytes_sent': 0}
         #set up the routing table for connected hosts
         self.rt_tbl_D = rt_tbl_D 
-        #set up the forwarding table for connected hosts
-        self.forwarding_table = forwarding_table
+        #forwarding information base {destination prefix: outgoing interface}, with longest-prefix match
+        self.fib_D = prefix.PrefixTable()
+        #equal-cost next hops {destination: interfaces}, for destinations that have several
+        self.multipath_D = {}
+        #flows are hashed with a per-router seed so that successive routers do not
+        #all make the same choice
+        self.hash_seed = zlib.crc32(str(name).encode())
+        #the routing protocol keeps rt_tbl_D, fib_D and multipath_D up to date
+        self.protocol = protocol
+        multipath_D = self.multipath_D if ecmp else None
+        if protocol == 'distance_vector':
+            self.routing = DistanceVector(self.intf_L, self.rt_tbl_D, self.fib_D, infinity, multipath_D,
+                                          track_hops=split_horizon or poison_reverse)
+        elif protocol == 'link_state':
+            self.routing = LinkState(name, self.intf_L, self.rt_tbl_D, self.fib_D, infinity, multipath_D)
+        else:
+            raise Exception('%s: unknown routing protocol %s' % (self, protocol))
+        self.split_horizon = split_horizon
+        self.poison_reverse = poison_reverse
+        #route summaries per interface {interface: [prefix key, ...]}
+        self.summary_D = {int(i): [prefix.from_S(p) for p in prefix_L] for i, prefix_L in (summary_D or {}).items()}
+        #link state: a new advertisement of this router and the shortest paths
+        #are computed once per batch of received advertisements, see process_queues
+        self.originate_pending = False
+        self.spf_pending = False
+        #distance vector: the destinations changed by a batch of received
+        #updates go out in one triggered update once the batch is processed,
+        #not with the costs of a half-processed batch, see process_queues
+        self.changed_S = set()
+        #triggered updates carry only the destinations that changed, at most one
+        #per hold_down; the whole table is re-sent every refresh_interval.
+        #Times are read from clock, which the event-driven runtimes replace.
+        self.hold_down = hold_down
+        self.refresh_interval = refresh_interval
+        self.clock = time.perf_counter
+        #called when a triggered update is held down, so that timers() runs when
+        #it is due; wakes the router thread, the event-driven runtimes replace it
+        self.arm_timers = self.readiness.notify
+        self.pending_S = set() #destinations changed since the last update
+        self.flush_time = None #when the pending destinations are sent
+        self.last_update_time = None #when the last routing update was sent
+        self.refresh_time = None #when the next full update is sent
+        self.last_change_time = None #when the routing table last changed, for the convergence time
+
+    ## thread termination flag, setting it wakes up the thread
+    @property
+    def stop(self):
+        return self._stop
+
+    @stop.setter
+    def stop(self, stop):
+        self._stop = stop
+        self.readiness.notify()
 
     ## called when printing the object
     def __str__(self):
         return 'Router_%s' % (self.name)
 
+    ## copy of the router and interface counters, safe to call while the simulation runs
+    def snapshot(self):
+        return dict(self.counter_D, last_change=self.last_change_time, intf_L=[intf.snapshot() for intf in self.intf_L])
+
     ## look through the content of incoming interfaces and 
     # process data and control packets
+    # @return number of packets processed
     def process_queues(self):
+        processed = 0
         for i in range(len(self.intf_L)):
-            pkt_S = None
             #get packet from interface i
-            pkt_S = self.intf_L[i].get('in')
+            pkt = self.intf_L[i].get('in')
             #if packet exists make a forwarding decision
-            if pkt_S is not None:
-                p = NetworkPacket.from_byte_S(pkt_S) #parse a packet out
+            if pkt is not None:
+                processed += 1
+                p = NetworkPacket.of(pkt)
                 if p.prot_S == 'data':
-                    self.forward_packet(p,i)
+                    self.forward_packet(p, i) #data packets are forwarded as they are
+                elif not self.intf_L[i].up:
+                    pass #routing packets that arrive as the link goes down are stale
                 elif p.prot_S == 'control':
-                    self.update_routes(p)
+                    self.update_routes(p, i)
+                    p.release()
+                elif p.prot_S == 'link_state':
+                    self.update_link_state(p, i)
+                    p.release()
                 else:
                     raise Exception('%s: Unknown packet type in packet %s' % (self, p))
+        if self.changed_S:
+            changed_S, self.changed_S = self.changed_S, set()
+            self.trigger(changed_S)
+        if self.originate_pending:
+            self.originate_pending = False
+            self.flood(self.routing.originate())
+            self.spf_pending = True
+        if self.spf_pending:
+            self.spf_pending = False
+            if self.routing.recompute():
+                self.last_change_time = self.clock()
+        return processed
             
     ## forward the packet according to the routing table
     #  @param p Packet to forward
     #  @param i Incoming interface number for packet p
     def forward_packet(self, p, i):
+        dst_addr = p.dst_addr
+        #forwarding information base lookup, kept up to date by the routing protocol
+        dst = self.fib_D.match(dst_addr)
+        if dst is None:
+            self.counter_D['no_route'] += 1
+            log.warning('%s: packet "%s" dropped, no route to %d', self, p, dst_addr)
+            if tracing.sink is not None:
+                tracing.sink.record(tracing.DROP, self, i, dst_addr, len(p))
+            p.release()
+            return
+        outgoing = self.fib_D[dst]
+        hop_L = self.multipath_D.get(dst)
+        if hop_L is not None:
+            #equal-cost multipath: the packets of a (source, destination) flow all take the same next hop
+            outgoing = hop_L[hash((p.source, dst_addr, self.hash_seed)) % len(hop_L)]
         try:
-            # TODO: Here you will need to implement a lookup into the 
-            # forwarding table to find the appropriate outgoing interface
-            # for now we assume the outgoing interface is also i
-            #router A
-            if (self.name == "A" and p.dst_addr == 3):
-                shorter_cost = min(self.intf_L[2].cost, self.intf_L[3].cost)
-                if (shorter_cost == self.intf_L[2].cost):
-                    outgoing = self.forwarding_table[0][0][1]
-            elif (self.name == "A" and p.dst_addr == 1):
-                outgoing = self.forwarding_table[1][2][1]
-
-            #router B
-            elif (self.name == "B" and p.dst_addr == 3):
-                outgoing = self.forwarding_table[0][1][1]
-
-            #router C
-            elif (self.name == "C" and p.dst_addr == 1):
-                outgoing = self.forwarding_table[1][1][1]
-
-            #router D
-            elif (self.name == "D" and p.dst_addr == 1):
-                shorter_cost = min(self.intf_L[0].cost, self.intf_L[1].cost)
-                if (shorter_cost == self.intf_L[1].cost):
-                    outgoing = self.forwarding_table[1][0][1]
-            elif (self.name == "D" and p.dst_addr == 3):
-                outgoing = self.forwarding_table[0][2][1]
-
-            print("Router_" + self.name + "-" + str(i), end=": ")
-            print('forwarding packet "%s"' % (p), end=" ")
-            print("from interface %d to %d" % (i, outgoing))
-            self.intf_L[outgoing].put(p.to_byte_S(), 'out', True)
+            self.intf_L[outgoing].put(p, 'out')
+            self.counter_D['forwarded'] += 1
+            log.debug('%s-%d: forwarding packet "%s" from interface %d to %d', self, i, p, i, outgoing)
+            if tracing.sink is not None:
+                tracing.sink.record(tracing.FORWARD, self, outgoing, dst_addr, len(p))
 
         except queue.Full:
-            print('%s: packet "%s" lost on interface %d' % (self, p, i))
-            pass
+            self.counter_D['dropped'] += 1
+            log.warning('%s: packet "%s" lost on interface %d', self, p, i)
+            if tracing.sink is not None:
+                tracing.sink.record(tracing.DROP, self, outgoing, dst_addr, len(p))
+            p.release()
         
     #a router will receive and update its own routing tables
     #call Bellman-Ford equation to compute updated costs to destinations
     #as you update costs, you may need to send out changes in routing table to other nodes using send_routes()
     ## forward the packet according to the routing table
     #  @param p Packet containing routing information
-    def update_routes(self, p):
-        #update own routing table based on what is received
-        #TODO: add logic to update the routing tables and
-        # possibly send out routing updates
-        print('%s: Received routing update %s' % (self, p))
-
-        message = p.data_S
-
-        global new_update_A
-        global new_update_D
-
-        if (self.name == "A" and new_update_A):
-            #check to see if we're receiving a packet from router B
-            if (int(message[5]) == 5):
-                new_update_A = False
-                cost = self.intf_L[2].cost + int(message[5])
-                self.rt_tbl_D[3] = {2: (cost)}
-                self.send_routes(p.source)
-
-        elif (self.name == "D" and new_update_D):
-            #check to see if we're receiving a packet from router C
-            if (int(message[0]) == 3):
-                new_update_D = False
-                cost = self.intf_L[1].cost + int(message[0])
-                self.rt_tbl_D[1] = {1: (cost)}
-                self.send_routes(p.source)
+    #  @param i Incoming interface number for packet p
+    def update_routes(self, p, i):
+        self.counter_D['updates_received'] += 1
+        log.debug('%s: Received routing update %s', self, p)
+        if tracing.sink is not None:
+            tracing.sink.record(tracing.ROUTE_UPDATE, self, i, p.dst_addr, len(p.payload))
+        message = Message.from_byte_S(p.payload)
+        #the neighbor's distance vector is its cheapest cost to each destination
+        vector_D = {dst: min(intf_cost_D.values()) for dst, intf_cost_D in message.rt_tbl_D.items()}
+        #triggered update, only of the destinations whose cost changed, sent by process_queues
+        changed_S = self.routing.update(i, vector_D, message.full)
+        if changed_S:
+            self.last_change_time = self.clock()
+            self.changed_S |= changed_S
+
+    ## process a link-state advertisement: flood it on if it is new, and
+    # have process_queues recompute the shortest paths
+    #  @param p Packet containing the advertisement
+    #  @param i Incoming interface number for packet p
+    def update_link_state(self, p, i):
+        self.counter_D['updates_received'] += 1
+        log.debug('%s: Received link state %s', self, p)
+        if tracing.sink is not None:
+            tracing.sink.record(tracing.ROUTE_UPDATE, self, i, p.dst_addr, len(p.payload))
+        if self.protocol != 'link_state':
+            return #not spoken by this router
+        message = LinkStateMessage.from_byte_S(p.payload)
+        flood, originate = self.routing.receive(i, message.sender, message.lsa)
+        if flood:
+            self.flood(message.lsa, i)
+            self.spf_pending = True
+        if originate:
+            self.originate_pending = True
+
+    ## send a link-state advertisement on every interface but the one it came in on
+    # @param lsa (origin, sequence number, {neighbor: cost}, {destination: cost})
+    # @param exclude Interface number not to send on, None to send on all
+    def flood(self, lsa, exclude=None):
+        payload = None
+        for i in range(len(self.intf_L)):
+            if i != exclude:
+                payload = self.send_link_state(lsa, i, payload)
+
+    ## send a link-state advertisement on one interface
+    # @param lsa (origin, sequence number, {neighbor: cost}, {destination: cost})
+    # @param i Interface number to send on
+    # @param payload The advertisement already encoded, None to encode it
+    # @return the encoded advertisement, for sending it on other interfaces
+    def send_link_state(self, lsa, i, payload=None):
+        if payload is None:
+            payload = LinkStateMessage(self.name, lsa).to_byte_S()
+        if not self.intf_L[i].up:
+            return payload
+        #a packet object per interface, each is released by the router receiving it
+        p = NetworkPacket.make(0, 'link_state', 0, payload)
+        try:
+            self.intf_L[i].put(p, 'out')
+            self.counter_D['updates_sent'] += 1
+            self.counter_D['routes_sent'] += len(lsa[2]) + len(lsa[3])
+            self.counter_D['control_bytes_sent'] += len(p)
+            log.debug('%s: sending link state "%s" from interface %d', self, p, i)
+        except queue.Full:
+            log.warning('%s: link state packet lost on interface %d', self, i)
+            p.release()
+        return payload
+
+    ## queue a triggered update, sent right away unless the last update went
+    # out less than hold_down ago; arm_timers then has the runtime send it when due
+    # @param dst_S: destinations whose cost changed
+    def trigger(self, dst_S):
+        self.pending_S |= dst_S
+        now = self.clock()
+        if self.flush_time is None:
+            if self.last_update_time is None:
+                self.flush_time = now
+            else:
+                self.flush_time = max(now, self.last_update_time + self.hold_down)
+        if now >= self.flush_time:
+            self.send_routes(dst_S=self.pending_S)
+        else:
+            self.arm_timers()
+
+    ## send the triggered update and the periodic full update when they are due,
+    # called by the runtimes after processing the queues and after arm_timers
+    # @return clock time the next one is due, None if none is pending
+    def timers(self):
+        now = self.clock()
+        if self.flush_time is not None and now >= self.flush_time:
+            self.send_routes(dst_S=self.pending_S)
+        if self.refresh_interval:
+            if self.refresh_time is None:
+                self.refresh_time = now + self.refresh_interval
+            elif now >= self.refresh_time:
+                self.send_routes()
+                self.refresh_time = now + self.refresh_interval
+        due_L = [due for due in (self.flush_time, self.refresh_time) if due is not None]
+        return min(due_L) if due_L else None
     
     #communicate routing table to nearby routers     
     ## send out route update
-    # @param source of packet
-    def send_routes(self, source):
-        message = Message(self.rt_tbl_D)
-
-        p = NetworkPacket(0, 'control', source, message.to_byte_S())
-        
-        #finding neighboring routers to send routing updates on
-        if (self.name == "A"):
-            neighbor1_intf = 2
-            neighbor2_intf = 3
+    # @param i Interface number on which to send out a routing update, None for all interfaces
+    # @param dst_S Destinations to send, None for the whole routing table
+    def send_routes(self, i=None, dst_S=None):
+        if self.protocol == 'link_state':
+            #link state advertises the router's own links on every interface
+            self.last_update_time = self.clock()
+            self.flood(self.routing.originate())
+            if self.routing.recompute():
+                self.last_change_time = self.clock()
+            return
+        if dst_S is None:
+            route_D = self.rt_tbl_D
+        else:
+            #destinations that are no longer reachable are withdrawn
+            route_D = {dst: self.rt_tbl_D.get(dst, {0: Message.infinity}) for dst in dst_S}
+        #every update carries the pending changes
+        self.pending_S = set()
+        self.flush_time = None
+        self.last_update_time = self.clock()
+        if i is None:
+            intf_L = range(len(self.intf_L))
+        else:
+            intf_L = [i]
+        payload = None
+        for i in intf_L:
+            if not self.intf_L[i].up:
+                continue
+            #the update differs per interface only with split horizon or summaries
+            if payload is None or self.split_horizon or self.poison_reverse or self.summary_D:
+                advertised_D = self.horizon(route_D, i, dst_S is None)
+                if i in self.summary_D:
+                    advertised_D = prefix.summarize(advertised_D, self.summary_D[i], self.rt_tbl_D, self.routing.infinity)
+                message = Message(advertised_D, full=dst_S is None)
+                payload = message.to_byte_S()
+            #a packet object per interface, each is released by the router receiving it
+            p = NetworkPacket.make(0, 'control', 0, payload)
+            try:
+                self.intf_L[i].put(p, 'out')
+                self.counter_D['updates_sent'] += 1
+                self.counter_D['routes_sent'] += len(message.rt_tbl_D)
+                self.counter_D['control_bytes_sent'] += len(p)
+                log.debug('%s: sending routing update "%s" from interface %d', self, p, i)
+            except queue.Full:
+                log.warning('%s: packet "%s" lost on interface %d', self, p, i)
+                p.release()
 
-        elif (self.name == "B"):
-            neighbor1_intf = 0
-            neighbor2_intf = 1
+    ## routes to advertise on an interface: with split horizon the routes
+    # with a next hop through it are left out, with poison reverse they are advertised
+    # as unreachable so the neighbor drops them at once. A partial update
+    # advertises them as unreachable either way, since the neighbor takes a
+    # destination left out of a partial update as unchanged.
+    # @param route_D Routes to advertise {destination: {interface: cost}}
+    # @param i Interface the routes are advertised on
+    # @param full True for a full update, False for a partial one
+    def horizon(self, route_D, i, full=True):
+        if not (self.split_horizon or self.poison_reverse):
+            return route_D
+        advertised_D = {}
+        for dst, intf_cost_D in route_D.items():
+            if i not in self.rt_tbl_D.get(dst, ()):
+                advertised_D[dst] = intf_cost_D
+            elif self.poison_reverse or not full:
+                advertised_D[dst] = {i: self.routing.infinity}
+        return advertised_D
 
-        elif (self.name == 'C'):
-            neighbor1_intf = 0
-            neighbor2_intf = 1
+    ## change the cost of an interface and update the routes through it
+    # @param i Interface number
+    # @param cost New cost of sending out of the interface
+    def set_cost(self, i, cost):
+        self.intf_L[i].cost = cost
+        if self.protocol == 'link_state':
+            self.send_routes()
+            return
+        changed_S = self.routing.cost_changed(i)
+        if changed_S:
+            self.last_change_time = self.clock()
+            self.trigger(changed_S)
 
-        elif (self.name == 'D'):
-            neighbor1_intf = 0
-            neighbor2_intf = 1
+    ## the link on interface i went down (see Link.fail): stop using the routes
+    # through it and tell the other neighbors
+    # @param i Interface number
+    def link_down(self, i):
+        self.intf_L[i].up = False
+        if self.protocol == 'link_state':
+            self.routing.link_down(i)
+            self.send_routes()
+            return
+        changed_S = self.routing.link_down(i)
+        if changed_S:
+            self.last_change_time = self.clock()
+            self.trigger(changed_S)
 
-        try:
-            self.intf_L[neighbor1_intf].put(p.to_byte_S(), 'out', True)
-            print('%s: sending routing update "%s" from interface %d' % (self, p, neighbor1_intf))
-
-            self.intf_L[neighbor2_intf].put(p.to_byte_S(), 'out', True)
-            print('%s: sending routing update "%s" from interface %d' % (self, p, neighbor2_intf))
-        except queue.Full:
-            print('%s: packet "%s" lost on interface %d' % (self, p, i))
-            pass
+    ## the link on interface i came back up (see Link.restore): use it again and
+    # send the neighbor on it everything it may have missed
+    # @param i Interface number
+    def link_up(self, i):
+        self.intf_L[i].up = True
+        if self.protocol == 'link_state':
+            self.send_routes()
+            for lsa in self.routing.database():
+                self.send_link_state(lsa, i)
+            return
+        if self.routing.link_up(i):
+            self.last_change_time = self.clock()
+        #a full update on every interface carries both the restored routes and
+        #the whole table for the new neighbor
+        self.send_routes()
 
     ## Print routing table
     def print_routes(self):
         print('%s: routing table' % self)
-        rt_tbl_items = self.rt_tbl_D.items()
-        rt_tbl_L = [["-", "-", "-"], ["-", "-", "-"], ["-", "-", "-"]]
-
-        for host, intf_cost in rt_tbl_items:
-            #router is utilizing 1 interface
-            if (len(intf_cost) == 1):
-                intf_cost = str(intf_cost)
-                intf = str(intf_cost[1])
-                cost = str(intf_cost[4])
-                rt_tbl_L[int(intf)][host-1] = cost
-            #router is utilizing 2 interfaces
-            elif (len(intf_cost) == 2):
-                intf_cost = str(intf_cost)
-                intf1 = str(intf_cost[1])
-                cost1 = str(intf_cost[4])
-                intf2 = str(intf_cost[7])
-                cost2 = str(intf_cost[10])
-
-                rt_tbl_L[int(intf1)][host-1] = cost1
-                rt_tbl_L[int(intf2)][host-1] = cost2
-
-        interface0 = ' '.join(rt_tbl_L[0])
-        interface1 = ' '.join(rt_tbl_L[1])
-        interface2 = ' '.join(rt_tbl_L[2])
+        #one row per interface, one column per destination
+        dst_L = sorted(self.rt_tbl_D)
+        width = max([len(prefix.to_S(dst)) for dst in dst_L] + 
+                    [len(str(cost)) for intf_cost_D in self.rt_tbl_D.values() for cost in intf_cost_D.values()] + [1])
 
         print()
         print("       Cost to")
-        print("       | 1 2 3")
-        print("     --+------")
-        print("     0 |", interface0)
-        print("From 1 |", interface1)
-        print("     2 |", interface2)
+        print("       | " + ' '.join([prefix.to_S(dst).rjust(width) for dst in dst_L]))
+        print("     --+" + '-' * ((width + 1) * len(dst_L)))
+        for intf in range(len(self.intf_L)):
+            cost_L = [str(self.rt_tbl_D[dst].get(intf, '-')).rjust(width) for dst in dst_L]
+            label = 'From' if intf == (len(self.intf_L) - 1) // 2 else '    '
+            print('%s %d |' % (label, intf), ' '.join(cost_L))
         print()
                 
     ## thread target for the host to keep forwarding data
     def run(self):
-        print (threading.currentThread().getName() + ': Starting')
+        log.info('%s: Starting', threading.currentThread().getName())
         while True:
-            self.process_queues()
+            #drain all interfaces before going back to sleep
+            while self.process_queues() > 0:
+                pass
             if self.stop:
-                print (threading.currentThread().getName() + ': Ending')
+                log.info('%s: Ending (%s)', threading.currentThread().getName(), self.readiness.latency_S())
                 return 
+            #sleep until a packet arrives on any interface, stop is set or a routing update is due
+            due = self.timers()
+            self.readiness.wait(None if due is None else max(0, due - self.clock()))
 
+## routing update carrying a router's routing table, or the routes that changed
 class Message:
-    def __init__(self, rt_tbl_D):
+    ## encoding: whether this is the full table and the number of routes,
+    # followed by one (destination address, prefix length, interface, cost)
+    # entry per route
+    header_struct = struct.Struct('!?I')
+    route_struct = struct.Struct('!IBHI')
+    ## cost of a withdrawn destination
+    infinity = 0xFFFFFFFF
+    __slots__ = ('rt_tbl_D', 'full')
+
+    ##@param rt_tbl_D: routing table {destination: {interface: cost}}
+    # @param full: True if rt_tbl_D is the whole routing table, False if only the changed routes
+    def __init__(self, rt_tbl_D, full=True):
         self.rt_tbl_D = rt_tbl_D
+        self.full = full
+
+    ## called when printing the object
+    def __str__(self):
+        return str(self.rt_tbl_D) if self.full else 'changes %s' % self.rt_tbl_D
 
     #convert routing table to a byte string for transmission over links
     def to_byte_S(self):
-        rt_tbl_items = self.rt_tbl_D.items()
-        rt_tbl_L = [["-", "-", "-"], ["-", "-", "-"], ["-", "-", "-"]]
-
-        for host, intf_cost in rt_tbl_items:
-            #router is utilizing 1 interface
-            if (len(intf_cost) == 1):
-                intf_cost = str(intf_cost)
-                intf = str(intf_cost[1])
-                cost = str(intf_cost[4])
-                rt_tbl_L[int(intf)][host-1] = cost
-            #router is utilizing 2 interfaces
-            elif (len(intf_cost) == 2):
-                intf_cost = str(intf_cost)
-                intf1 = str(intf_cost[1])
-                cost1 = str(intf_cost[4])
-                intf2 = str(intf_cost[7])
-                cost2 = str(intf_cost[10])
-
-                rt_tbl_L[int(intf1)][host-1] = cost1
-                rt_tbl_L[int(intf2)][host-1] = cost2
-
-        interface0 = ''.join(rt_tbl_L[0])
-        interface1 = ''.join(rt_tbl_L[1])
-        interface2 = ''.join(rt_tbl_L[2])
-        byte_S = interface0 + interface1 + interface2
-        return byte_S
\ No newline at end of file
+        route_L = [prefix.split(dst) + (intf, cost) for dst, intf_cost_D in self.rt_tbl_D.items() for intf, cost in intf_cost_D.items()]
+        byte_S = bytearray(self.header_struct.pack(self.full, len(route_L)))
+        for route in route_L:
+            byte_S += self.route_struct.pack(*route)
+        return bytes(byte_S)
+
+    #extract a message from a byte string
+    #@param byte_S: byte string representation of a message
+    @classmethod
+    def from_byte_S(self, byte_S):
+        full, count = self.header_struct.unpack_from(byte_S)
+        start = self.header_struct.size
+        rt_tbl_D = {}
+        for addr, length, intf, cost in self.route_struct.iter_unpack(byte_S[start : start + count * self.route_struct.size]):
+            rt_tbl_D.setdefault(prefix.key(addr, length), {})[intf] = cost
+        return self(rt_tbl_D, full)
+
+
+## link-state advertisement as flooded between routers
+class LinkStateMessage:
+    ## encoding: sender and origin router names (a length byte and UTF-8), the
+    # sequence number and the numbers of links and destinations, then a
+    # (neighbor name, cost) entry per link and a (destination address, prefix
+    # length, cost) entry per destination
+    name_struct = struct.Struct('!B')
+    count_struct = struct.Struct('!III')
+    cost_struct = struct.Struct('!I')
+    stub_struct = struct.Struct('!IBI')
+    __slots__ = ('sender', 'lsa')
+
+    ##@param sender: name of the router that sent the advertisement on the link
+    # @param lsa: (origin, sequence number, {neighbor: cost}, {destination: cost})
+    def __init__(self, sender, lsa):
+        self.sender = sender
+        self.lsa = lsa
+
+    ## called when printing the object
+    def __str__(self):
+        origin, seq, link_D, stub_D = self.lsa
+        return 'LSA %s#%d from %s links %s destinations %s' % (origin, seq, self.sender, link_D, stub_D)
+
+    ## append a length-prefixed router name
+    @classmethod
+    def pack_name(self, byte_S, name):
+        name_S = name.encode()
+        byte_S += self.name_struct.pack(len(name_S))
+        byte_S += name_S
+
+    ## read a length-prefixed router name
+    # @return (name, offset after it)
+    @classmethod
+    def unpack_name(self, byte_S, offset):
+        (length,) = self.name_struct.unpack_from(byte_S, offset)
+        offset += self.name_struct.size
+        return str(byte_S[offset : offset + length], 'utf-8'), offset + length
+
+    #convert the advertisement to a byte string for transmission over links
+    def to_byte_S(self):
+        origin, seq, link_D, stub_D = self.lsa
+        byte_S = bytearray()
+        self.pack_name(byte_S, self.sender)
+        self.pack_name(byte_S, origin)
+        byte_S += self.count_struct.pack(seq, len(link_D), len(stub_D))
+        for neighbor, cost in link_D.items():
+            self.pack_name(byte_S, neighbor)
+            byte_S += self.cost_struct.pack(cost)
+        for dst, cost in stub_D.items():
+            byte_S += self.stub_struct.pack(*prefix.split(dst) + (cost,))
+        return bytes(byte_S)
+
+    #extract an advertisement from a byte string
+    #@param byte_S: byte string representation of an advertisement
+    @classmethod
+    def from_byte_S(self, byte_S):
+        sender, offset = self.unpack_name(byte_S, 0)
+        origin, offset = self.unpack_name(byte_S, offset)
+        seq, link_count, stub_count = self.count_struct.unpack_from(byte_S, offset)
+        offset += self.count_struct.size
+        link_D = {}
+        for k in range(link_count):
+            neighbor, offset = self.unpack_name(byte_S, offset)
+            (link_D[neighbor],) = self.cost_struct.unpack_from(byte_S, offset)
+            offset += self.cost_struct.size
+        stub_D = {}
+        for addr, length, cost in self.stub_struct.iter_unpack(byte_S[offset : offset + stub_count * self.stub_struct.size]):
+            stub_D[prefix.key(addr, length)] = cost
+        return self(sender, (origin, seq, link_D, stub_D))
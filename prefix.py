@@ -0,0 +1,168 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Address prefixes for routing. A destination is a 32-bit host address, as
+before, or a prefix covering a block of addresses. Prefixes are keyed by
+integers above the address space, so a host address is its own /32 prefix
+and routing tables, messages and sorting keep working on plain integers:
+the prefix of length l < 32 starting at addr has the key
+((l + 1) << 32) | addr. Prefixes are written 'addr/length', e.g. '16/28' for
+the hosts 16 to 31.
+'''
+
+## number of bits in an address
+address_bits = 32
+## keys below this are host addresses
+host_limit = 1 << address_bits
+
+## bits of an address kept by a prefix of a given length
+def mask(length):
+    return (0xFFFFFFFF << (address_bits - length)) & 0xFFFFFFFF
+
+## key of the prefix of a given length containing an address
+def key(addr, length):
+    if length == address_bits:
+        return addr
+    return ((length + 1) << address_bits) | (addr & mask(length))
+
+## address and length of a prefix
+# @return (address, length)
+def split(key):
+    if key < host_limit:
+        return key, address_bits
+    return key & 0xFFFFFFFF, (key >> address_bits) - 1
+
+## printable form of a prefix, the address alone for a host
+def to_S(key):
+    addr, length = split(key)
+    return str(addr) if length == address_bits else '%d/%d' % (addr, length)
+
+## key of a prefix written 'addr/length' or of a host address
+def from_S(prefix_S):
+    if '/' not in str(prefix_S):
+        return int(prefix_S)
+    addr_S, length_S = prefix_S.split('/')
+    return key(int(addr_S), int(length_S))
+
+
+## forwarding table {prefix key: value} with longest-prefix-match lookup. It is
+# a dict, so exact lookups and updates stay dict operations; it also keeps
+# the prefix lengths in use, longest first, and match() probes one dict entry
+# per length (host addresses first) rather than walking a trie bit by bit
+class PrefixTable(dict):
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        self.count_D = {} #prefix length -> number of prefixes of that length
+        self.probe_L = [] #(key bits of the length, address mask) per length in use, longest first
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if key >= host_limit and key not in self:
+            length = split(key)[1]
+            self.count_D[length] = self.count_D.get(length, 0) + 1
+            if self.count_D[length] == 1:
+                self.update_probes()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        if key >= host_limit:
+            length = split(key)[1]
+            self.count_D[length] -= 1
+            if self.count_D[length] == 0:
+                del self.count_D[length]
+                self.update_probes()
+
+    def pop(self, key, *default_L):
+        if key in self:
+            value = dict.__getitem__(self, key)
+            del self[key]
+            return value
+        if default_L:
+            return default_L[0]
+        raise KeyError(key)
+
+    def update(self, *args, **kwargs):
+        item_D = dict(*args, **kwargs)
+        #host addresses, most of a large table, need no bookkeeping
+        for key in [key for key in item_D if key >= host_limit]:
+            self[key] = item_D.pop(key)
+        dict.update(self, item_D)
+
+    def clear(self):
+        dict.clear(self)
+        self.count_D = {}
+        self.probe_L = []
+
+    ## rebuild probe_L after a prefix length came into or went out of use
+    def update_probes(self):
+        self.probe_L = [((length + 1) << address_bits, mask(length)) for length in sorted(self.count_D, reverse=True)]
+
+    ## longest-prefix match
+    # @param addr: destination address
+    # @return key of the longest prefix containing addr, None if there is none
+    def match(self, addr):
+        if addr in self:
+            return addr
+        for bits, addr_mask in self.probe_L:
+            key = bits | (addr & addr_mask)
+            if key in self:
+                return key
+        return None
+
+
+## smallest list of prefixes covering a range of addresses exactly
+# @param first: first address of the range
+# @param last: last address of the range
+# @return list of prefix keys
+def cover(first, last):
+    key_L = []
+    while first <= last:
+        length = address_bits
+        #widen the prefix while it stays aligned and inside the range
+        while length > 0 and first & ~mask(length - 1) & 0xFFFFFFFF == 0 and first | (0xFFFFFFFF >> (length - 1)) <= last:
+            length -= 1
+        key_L.append(key(first, length))
+        first += 1 << (address_bits - length)
+    return key_L
+
+## whether a prefix contains another prefix or an address
+def contains(outer, inner):
+    outer_addr, outer_length = split(outer)
+    inner_addr, inner_length = split(inner)
+    return inner_length >= outer_length and inner_addr & mask(outer_length) == outer_addr
+
+
+## replace the routes covered by summary prefixes with the summaries, as a
+# router does on the interfaces it is configured to summarize on. A summary
+# is advertised at the lowest cost of the routes it covers and only while one
+# of them is reachable, so the routers configured with it are its only origins.
+# Forwarding prefers a more specific route over a summary even when the
+# summary is cheaper, so summaries suit areas whose hosts are reached only
+# through the area's own routers.
+# @param route_D: routes to advertise {prefix key: {interface: cost}}
+# @param summary_L: summary prefix keys
+# @param table_D: whole routing table the summary costs are taken from
+# @param infinity: cost of an unreachable destination
+# @return routes to advertise with the summaries
+def summarize(route_D, summary_L, table_D, infinity):
+    advertised_D = {}
+    summarized_S = set()
+    for dst, intf_cost_D in route_D.items():
+        for summary in summary_L:
+            if contains(summary, dst):
+                summarized_S.add(summary)
+                break
+        else:
+            advertised_D[dst] = intf_cost_D
+    for summary in summarized_S:
+        #the summary's own entry in the table, if any, was learned from another origin
+        #(unless the summary is a single host)
+        cost = min([min(intf_cost_D.values()) for dst, intf_cost_D in table_D.items()
+                    if (dst != summary or dst < host_limit) and contains(summary, dst)] + [infinity])
+        advertised_D[summary] = {0: cost}
+    return advertised_D
@@ -0,0 +1,297 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+import heapq
+
+## Distance-vector (Bellman-Ford) routing state of a single router.
+# Keeps the last vector advertised by the neighbor on each interface and
+# recomputes only the destinations whose advertised cost changed.
+class DistanceVector:
+    ## default cost at which a destination is unreachable, the cost
+    # Message.infinity that withdraws a destination
+    infinity = 0xFFFFFFFF
+
+    ##@param intf_L: router interfaces, Interface.cost is the cost of sending out of each one
+    # @param rt_tbl_D: configured routes {destination: {interface: cost}}, kept up to date in place
+    # @param fib_D: forwarding information base {destination: interface}, kept up to date in place
+    # @param infinity: cost at which a destination counts as unreachable, None for the default;
+    #   a small infinity bounds how far costs count up after a failure
+    # @param multipath_D: {destination: interfaces} of the destinations with several
+    #   equal-cost next hops, kept up to date in place, None to keep a single next hop
+    # @param track_hops: also report destinations whose next hops changed at the same cost,
+    #   for routers whose updates depend on the next hops (split horizon, poison reverse)
+    def __init__(self, intf_L, rt_tbl_D, fib_D, infinity=None, multipath_D=None, track_hops=False):
+        if infinity is not None:
+            self.infinity = infinity
+        self.intf_L = intf_L
+        self.rt_tbl_D = rt_tbl_D
+        self.fib_D = fib_D
+        self.multipath_D = multipath_D
+        self.track_hops = track_hops
+        #configured routes are always candidates, whatever the neighbors advertise
+        self.static_D = {dst: dict(intf_cost_D) for dst, intf_cost_D in rt_tbl_D.items()}
+        #last vector {destination: cost} received on each interface
+        self.neighbor_D = {}
+        for dst, intf_cost_D in rt_tbl_D.items():
+            self.fib_D[dst] = min(intf_cost_D, key=lambda intf: (intf_cost_D[intf], intf))
+
+    ## the router's own distance vector
+    # @return {destination: cost}
+    def vector(self):
+        return {dst: min(intf_cost_D.values()) for dst, intf_cost_D in self.rt_tbl_D.items()}
+
+    ## process a distance vector advertised by the neighbor on interface i
+    # @param i: interface the vector was received on
+    # @param vector_D: {destination: cost} advertised by the neighbor, infinity withdraws a destination
+    # @param full: True if vector_D is the neighbor's whole vector, False if only the changed destinations
+    # @return set of destinations whose cost in this router's vector changed
+    def update(self, i, vector_D, full=True):
+        if full:
+            old_D = self.neighbor_D.get(i, {})
+            new_D = {dst: cost for dst, cost in vector_D.items() if cost < self.infinity}
+            self.neighbor_D[i] = new_D
+            dst_S = old_D.keys() | new_D.keys()
+        else:
+            #changes are applied in place, the work depends on the size of the update only
+            new_D = self.neighbor_D.setdefault(i, {})
+            old_D = {dst: new_D[dst] for dst in vector_D if dst in new_D}
+            for dst, cost in vector_D.items():
+                if cost < self.infinity:
+                    new_D[dst] = cost
+                else:
+                    new_D.pop(dst, None)
+            dst_S = vector_D.keys()
+        changed = set()
+        for dst in dst_S:
+            if old_D.get(dst) != new_D.get(dst) and self.recompute(dst):
+                changed.add(dst)
+        return changed
+
+    ## the cost of interface i changed, recompute the destinations advertised on it
+    # @return set of destinations whose cost in this router's vector changed
+    def cost_changed(self, i):
+        return {dst for dst in list(self.neighbor_D.get(i, {})) if self.recompute(dst)}
+
+    ## the link on interface i went down, forget the neighbor's vector and
+    # stop using the configured routes through it
+    # @return set of destinations whose cost in this router's vector changed
+    def link_down(self, i):
+        dst_S = set(self.neighbor_D.pop(i, {}))
+        dst_S |= {dst for dst, intf_cost_D in self.static_D.items() if i in intf_cost_D}
+        return {dst for dst in dst_S if self.recompute(dst)}
+
+    ## the link on interface i came back up, use the configured routes through
+    # it again; the neighbor's routes come with its next update
+    # @return set of destinations whose cost in this router's vector changed
+    def link_up(self, i):
+        return {dst for dst, intf_cost_D in self.static_D.items() if i in intf_cost_D and self.recompute(dst)}
+
+    ## Bellman-Ford equation for one destination: the cheapest of the configured
+    # routes and each neighbor's cost plus the cost of the interface to it,
+    # costs of infinity and more and interfaces that are down are unreachable
+    # @param dst: destination to recompute
+    # @return True if the cost to dst changed, or its next hops with track_hops
+    def recompute(self, dst):
+        best = None
+        hop_L = [] #interfaces at the best cost
+        candidate_L = [(intf, cost) for intf, cost in self.static_D.get(dst, {}).items() if self.intf_L[intf].up]
+        for intf, vector_D in self.neighbor_D.items():
+            if dst in vector_D:
+                candidate_L.append((intf, self.intf_L[intf].cost + vector_D[dst]))
+        for intf, cost in candidate_L:
+            if cost >= self.infinity:
+                continue
+            if best is None or cost < best:
+                best, hop_L = cost, [intf]
+            elif cost == best and intf not in hop_L:
+                hop_L.append(intf)
+        old_intf_cost_D = self.rt_tbl_D.get(dst)
+        old_cost = min(old_intf_cost_D.values()) if old_intf_cost_D else None
+        if best is None:
+            self.rt_tbl_D.pop(dst, None)
+            self.fib_D.pop(dst, None)
+            if self.multipath_D is not None:
+                self.multipath_D.pop(dst, None)
+            return old_cost is not None
+        set_routes(self, dst, best, hop_L)
+        if self.track_hops and old_cost == best:
+            return old_intf_cost_D.keys() != self.rt_tbl_D[dst].keys()
+        return old_cost != best
+
+
+## Link-state routing state of a single router. Every router floods a
+# link-state advertisement (LSA) listing its neighbor routers and its
+# directly reachable destinations; each router keeps the newest LSA of every
+# origin and computes shortest paths over them with Dijkstra's algorithm.
+class LinkState:
+    ## default cost at which a destination is unreachable, as DistanceVector
+    infinity = DistanceVector.infinity
+
+    ##@param name: name of this router, identifies its LSAs
+    # @param intf_L: router interfaces, Interface.cost is the cost of sending out of each one
+    # @param rt_tbl_D: configured routes {destination: {interface: cost}}, kept up to date in place
+    # @param fib_D: forwarding information base {destination: interface}, kept up to date in place
+    # @param infinity: cost at which a destination counts as unreachable, None for the default
+    # @param multipath_D: {destination: interfaces} of the destinations with several
+    #   equal-cost next hops, kept up to date in place, None to keep a single next hop
+    def __init__(self, name, intf_L, rt_tbl_D, fib_D, infinity=None, multipath_D=None):
+        if infinity is not None:
+            self.infinity = infinity
+        self.name = name
+        self.intf_L = intf_L
+        self.rt_tbl_D = rt_tbl_D
+        self.fib_D = fib_D
+        self.multipath_D = multipath_D
+        #configured routes are advertised as destinations reachable from this router
+        self.static_D = {dst: dict(intf_cost_D) for dst, intf_cost_D in rt_tbl_D.items()}
+        #neighbor router on each interface, learned from the LSAs it sends
+        self.neighbor_D = {}
+        #newest LSA of each origin {origin: (sequence number, {neighbor: cost}, {destination: cost})}
+        self.lsdb_D = {}
+        self.seq = 0
+        for dst, intf_cost_D in rt_tbl_D.items():
+            self.fib_D[dst] = min(intf_cost_D, key=lambda intf: (intf_cost_D[intf], intf))
+
+    ## build a new LSA of this router from its interface costs
+    # @return (origin, sequence number, {neighbor: cost}, {destination: cost})
+    def originate(self):
+        self.seq += 1
+        link_D = {}
+        for i, neighbor in self.neighbor_D.items():
+            cost = self.intf_L[i].cost
+            if cost < self.infinity and (neighbor not in link_D or cost < link_D[neighbor]):
+                link_D[neighbor] = cost
+        stub_D = {}
+        for dst, intf_cost_D in self.static_D.items():
+            cost_L = [cost for intf, cost in intf_cost_D.items() if self.intf_L[intf].up]
+            if cost_L:
+                stub_D[dst] = min(cost_L)
+        self.lsdb_D[self.name] = (self.seq, link_D, stub_D)
+        return (self.name, self.seq, link_D, stub_D)
+
+    ## LSAs of every origin, sent to a neighbor whose link comes up so that it
+    # learns what changed while the link was down
+    # @return list of (origin, sequence number, {neighbor: cost}, {destination: cost})
+    def database(self):
+        return [(origin, seq, link_D, stub_D) for origin, (seq, link_D, stub_D) in self.lsdb_D.items()]
+
+    ## the link on interface i went down, the neighbor on it is forgotten until
+    # it sends an LSA again
+    def link_down(self, i):
+        self.neighbor_D.pop(i, None)
+
+    ## process an LSA received on interface i
+    # @param i: interface the LSA was received on
+    # @param sender: neighbor router that sent it on the link
+    # @param lsa: (origin, sequence number, {neighbor: cost}, {destination: cost})
+    # @return (whether the LSA is new and must be flooded on, whether this router
+    #   must originate a new LSA because its neighbors changed)
+    def receive(self, i, sender, lsa):
+        new_neighbor = self.neighbor_D.get(i) != sender
+        self.neighbor_D[i] = sender
+        origin, seq, link_D, stub_D = lsa
+        if origin == self.name:
+            #an LSA this router sent before a restart, outdo it
+            if seq > self.seq:
+                self.seq = seq
+                return False, True
+            return False, new_neighbor
+        if origin in self.lsdb_D and self.lsdb_D[origin][0] >= seq:
+            return False, new_neighbor
+        self.lsdb_D[origin] = (seq, link_D, stub_D)
+        return True, new_neighbor
+
+    ## Dijkstra's algorithm from this router over the links both ends advertise,
+    # then the cheapest routers for each destination; fills rt_tbl_D and fib_D
+    # @return set of destinations whose cost changed
+    def recompute(self):
+        #first hop interfaces to each neighbor, the cheapest ones if there are parallel links
+        first_D = {}
+        for i, neighbor in self.neighbor_D.items():
+            cost = self.intf_L[i].cost
+            if neighbor not in first_D or cost < first_D[neighbor][0]:
+                first_D[neighbor] = (cost, {i})
+            elif cost == first_D[neighbor][0]:
+                first_D[neighbor][1].add(i)
+        #shortest cost to each router and the first hops of all the paths at that cost
+        dist_D = {self.name: 0}
+        hop_D = {self.name: set()}
+        done_S = set()
+        heap_L = [(0, self.name)]
+        while heap_L:
+            cost, router = heapq.heappop(heap_L)
+            if router in done_S:
+                continue
+            done_S.add(router)
+            if router not in self.lsdb_D:
+                continue
+            for neighbor, link_cost in self.lsdb_D[router][1].items():
+                #a link counts only when the neighbor advertises it back
+                if neighbor in done_S or neighbor not in self.lsdb_D or router not in self.lsdb_D[neighbor][1]:
+                    continue
+                if router == self.name:
+                    if neighbor not in first_D:
+                        continue
+                    link_cost, hop_S = first_D[neighbor]
+                else:
+                    hop_S = hop_D[router]
+                new_cost = cost + link_cost
+                if new_cost >= self.infinity:
+                    continue
+                if neighbor not in dist_D or new_cost < dist_D[neighbor]:
+                    dist_D[neighbor] = new_cost
+                    hop_D[neighbor] = set(hop_S)
+                    heapq.heappush(heap_L, (new_cost, neighbor))
+                elif new_cost == dist_D[neighbor]:
+                    hop_D[neighbor] |= hop_S
+        #cheapest cost to each destination and its first hops, configured routes included
+        route_D = {}
+        for dst, intf_cost_D in self.static_D.items():
+            intf_cost_D = {intf: cost for intf, cost in intf_cost_D.items() if self.intf_L[intf].up}
+            if intf_cost_D:
+                cost = min(intf_cost_D.values())
+                route_D[dst] = (cost, {intf for intf, intf_cost in intf_cost_D.items() if intf_cost == cost})
+        for router in done_S:
+            if router == self.name or router not in self.lsdb_D:
+                continue
+            for dst, stub_cost in self.lsdb_D[router][2].items():
+                cost = dist_D[router] + stub_cost
+                if cost >= self.infinity:
+                    continue
+                if dst not in route_D or cost < route_D[dst][0]:
+                    route_D[dst] = (cost, set(hop_D[router]))
+                elif cost == route_D[dst][0]:
+                    route_D[dst][1].update(hop_D[router])
+        changed = set()
+        for dst in list(self.rt_tbl_D):
+            if dst not in route_D:
+                del self.rt_tbl_D[dst]
+                self.fib_D.pop(dst, None)
+                if self.multipath_D is not None:
+                    self.multipath_D.pop(dst, None)
+                changed.add(dst)
+        for dst, (cost, hop_S) in route_D.items():
+            if dst not in self.rt_tbl_D or min(self.rt_tbl_D[dst].values()) != cost:
+                changed.add(dst)
+            set_routes(self, dst, cost, hop_S)
+        return changed
+
+
+## store the route to a destination in a routing engine's tables
+# @param engine: DistanceVector or LinkState
+# @param dst: destination
+# @param cost: cost of the route
+# @param hop_L: interfaces of the equal-cost next hops; all are kept if the engine
+#   has a multipath_D, otherwise only the lowest numbered one
+def set_routes(engine, dst, cost, hop_L):
+    hop_L = sorted(hop_L)
+    if engine.multipath_D is None:
+        hop_L = hop_L[:1]
+    elif len(hop_L) > 1:
+        engine.multipath_D[dst] = tuple(hop_L)
+    else:
+        engine.multipath_D.pop(dst, None)
+    engine.rt_tbl_D[dst] = {intf: cost for intf in hop_L}
+    engine.fib_D[dst] = hop_L[0]
@@ -0,0 +1,360 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Runs a topology as several shards, each a discrete-event simulation in its
+own process, so large networks use more than one CPU core. The routers are
+split into shards of neighboring routers. Packets sent on a link between
+shards are carried over the process pipes instead of interface queues.
+
+The shards are kept in step with conservative synchronization. Every shard
+runs the same virtual time window, one link delay long and excluding its
+end. Then the packets that crossed a shard boundary are handed to their
+destination shards. A packet put on a boundary link at time t arrives at
+t + link_delay, which is never earlier than the end of the window it was
+sent in. So no shard receives a packet in its past. Each window starts at
+the earliest pending event, so idle stretches of virtual time are skipped.
+
+The links inside a shard carry packets with the same timing as the links
+between shards, and arrivals run before the other events of their time
+(EventSimulator.arrive). A shard thus handles the same events in the same
+order however the network is split, and every shard count simulates the
+same network. Compare shard counts with
+
+    python shard.py --topology grid --routers 400 --packets 20000 --shards 1,2,4,8
+'''
+import benchmark
+import event_sim
+import metrics
+import topology
+import tracing
+from tracing import log
+import argparse
+import collections
+import importlib
+import json
+import logging
+import multiprocessing
+import random
+import sys
+import time
+
+## split the routers of a topology into shards of equal size, in breadth-first
+# order so that neighboring routers tend to share a shard; each host goes with
+# the router it is linked to
+# @param topo_D: topology description, see topology.py
+# @param shards: number of shards
+# @return {node name: shard number}
+def partition(topo_D, shards):
+    peer_D = topology.peers(topo_D)
+    neighbor_D = {router['name']: [] for router in topo_D.get('routers', [])}
+    for (node, intf), (peer, peer_intf) in peer_D.items():
+        if node in neighbor_D and peer in neighbor_D:
+            neighbor_D[node].append(peer)
+    order_L = []
+    seen_S = set()
+    for start in neighbor_D:
+        if start in seen_S:
+            continue
+        seen_S.add(start)
+        bfs_Q = collections.deque([start])
+        while bfs_Q:
+            node = bfs_Q.popleft()
+            order_L.append(node)
+            for peer in neighbor_D[node]:
+                if peer not in seen_S:
+                    seen_S.add(peer)
+                    bfs_Q.append(peer)
+    shard_D = {name: k * shards // len(order_L) for k, name in enumerate(order_L)}
+    for addr in topo_D.get('hosts', []):
+        peer = peer_D.get((addr, 0))
+        shard_D[addr] = shard_D.get(peer[0], 0) if peer is not None else 0
+    return shard_D
+
+
+## the half of a link between shards that sends packets out of this shard;
+# takes the place of a Link, which needs both interfaces in one process
+class BoundaryLink:
+
+    ##@param sim: EventSimulator of the shard
+    # @param outbox_L: list collecting (arrival time, node name, interface, packet) of packets leaving the shard
+    # @param node: node in this shard
+    # @param node_intf: number of the interface on that node
+    # @param peer: name of the node in the other shard
+    # @param peer_intf: number of the interface on that node
+    # @param delay: virtual time for the link to carry a batch of packets
+    # @param batch_size: maximum number of packets carried per delay, as Link
+    def __init__(self, sim, outbox_L, node, node_intf, peer, peer_intf, delay, batch_size=1):
+        self.sim = sim
+        self.outbox_L = outbox_L
+        self.node = node
+        self.node_intf = node_intf
+        self.intf = node.intf_L[node_intf]
+        self.peer = peer
+        self.peer_intf = peer_intf
+        self.delay = delay
+        self.batch_size = batch_size
+        #arrival time of the batch being filled and the packets in it
+        self.batch_time = None
+        self.batch_count = 0
+        #packets are taken as soon as they are sent, their arrival time is known then
+        event_sim.Wakeup(sim, self.tx_pkt, 0, [(self.intf, 'out')])
+
+    ## called when printing the object
+    def __str__(self):
+        return 'Link %s-%d - %s-%d' % (self.node, self.node_intf, self.peer, self.peer_intf)
+
+    ## take the packets off the out queue, batch_size packets arrive every
+    # delay as they would on a Link driven by the EventSimulator
+    def tx_pkt(self):
+        while True:
+            pkt = self.intf.get('out')
+            if pkt is None:
+                return
+            if self.batch_time is None or self.batch_time < self.sim.now + self.delay:
+                self.batch_time, self.batch_count = self.sim.now + self.delay, 0
+            elif self.batch_count == self.batch_size:
+                self.batch_time, self.batch_count = self.batch_time + self.delay, 0
+            self.batch_count += 1
+            self.deliver(self.batch_time, pkt)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug('%s: transmitting %d byte packet to %s', self, len(pkt), self.peer)
+            if tracing.sink is not None:
+                tracing.sink.record(tracing.TRANSMIT, self, self.node_intf, 0, len(pkt))
+
+    ## hand a packet to the other shard
+    # @param at: arrival time of the packet
+    # @param pkt: the packet
+    def deliver(self, at, pkt):
+        #packets cross to the other process encoded, its routers parse them
+        pkt_S = pkt.to_byte_S() if hasattr(pkt, 'to_byte_S') else pkt
+        self.outbox_L.append((at, self.peer, self.peer_intf, pkt_S))
+
+
+## one direction of a link inside a shard. It carries packets with the timing
+# of a BoundaryLink rather than that of a Link, whose two directions share
+# their transmissions, so that a link behaves the same whether or not its
+# ends are in the same shard
+class ShardLink(BoundaryLink):
+
+    ##@param sim: EventSimulator of the shard
+    # @param node: node sending on the link
+    # @param node_intf: number of the interface on that node
+    # @param peer: node receiving from the link
+    # @param peer_intf: number of the interface on that node
+    # @param delay, batch_size: see BoundaryLink
+    def __init__(self, sim, node, node_intf, peer, peer_intf, delay, batch_size=1):
+        BoundaryLink.__init__(self, sim, None, node, node_intf, peer, peer_intf, delay, batch_size)
+        self.peer_in = peer.intf_L[peer_intf]
+
+    ## put a packet on the peer's in queue at its arrival time
+    def deliver(self, at, pkt):
+        self.sim.arrive(at - self.sim.now, self.peer_in.put, pkt, 'in')
+
+
+## process target running one shard, driven by commands from ShardedSimulation
+# @param conn: pipe to the ShardedSimulation
+# @param topo_D: topology description of the whole network
+# @param node_S: names of the hosts and routers in this shard
+# @param network_S: name of the module providing Host and Router
+# @param link_S: name of the module providing Link and LinkLayer
+# @param max_queue_size: max queue length of router interfaces
+# @param link_delay: virtual time for a link to carry one packet in each direction
+# @param node_delay: virtual time for a host or router to process its queues
+# @param log_level: logging level of the shard
+def run_shard(conn, topo_D, node_S, network_S, link_S, max_queue_size, link_delay, node_delay, log_level):
+    tracing.configure(log_level)
+    network = importlib.import_module(network_S)
+    link = importlib.import_module(link_S)
+    topo = topology.Topology(topo_D, network, link, max_queue_size, node_S)
+    #the simulator drives ShardLinks in place of the topology's links
+    sim = event_sim.EventSimulator(link.LinkLayer(), topo.object_L, link_delay, node_delay)
+    for l in topo.link_layer.link_L:
+        for node, node_intf, peer, peer_intf in [(l.node_1, l.node_1_intf, l.node_2, l.node_2_intf),
+                                                 (l.node_2, l.node_2_intf, l.node_1, l.node_1_intf)]:
+            ShardLink(sim, node, node_intf, peer, peer_intf, link_delay, l.batch_size)
+    outbox_L = []
+    for node, node_intf, peer, peer_intf, option_D in topo.boundary_L:
+        BoundaryLink(sim, outbox_L, node, node_intf, peer, peer_intf, link_delay, option_D.get('batch_size', 1))
+    while True:
+        command, arg_L = conn.recv()
+        if command == 'window':
+            until, inbox_L, send_L = arg_L
+            for at, name, intf, pkt_S in inbox_L:
+                sim.arrive(at - sim.now, topo.node(name).intf_L[intf].put, pkt_S, 'in')
+            for at, src, send_arg_L in send_L:
+                sim.schedule(at - sim.now, topo.host_D[src].udt_send, *send_arg_L)
+            #a packet sent at the start of the window arrives at its end, in the next window
+            sim.run(until, exclusive=True)
+            conn.send((outbox_L, sim.event_L[0][0] if sim.event_L else None))
+            del outbox_L[:]
+        elif command == 'send_routes':
+            for router in topo.router_D.values():
+                router.send_routes()
+            conn.send(sim.event_L[0][0] if sim.event_L else None)
+        elif command == 'snapshot':
+            conn.send(metrics.snapshot(topo.object_L))
+        elif command == 'fib':
+            conn.send({name: dict(router.fib_D) for name, router in topo.router_D.items()})
+        elif command == 'stop':
+            conn.send(sim.events_run)
+            conn.close()
+            return
+        else:
+            raise Exception('shard: unknown command %s' % command)
+
+
+## a network simulated by several shard processes
+class ShardedSimulation:
+
+    ##@param topo_D: topology description, see topology.py
+    # @param shards: number of shard processes
+    # @param network_S: name of the module providing Host and Router
+    # @param link_S: name of the module providing Link and LinkLayer
+    # @param max_queue_size: max queue length of router interfaces
+    # @param link_delay: virtual time for a link to carry one packet in each direction,
+    #   also the length of the synchronization window
+    # @param node_delay: virtual time for a host or router to process its queues
+    # @param log_level: logging level of the shards
+    def __init__(self, topo_D, shards, network_S='network_2', link_S='link_2', max_queue_size=0,
+                 link_delay=1.0, node_delay=0.0, log_level=logging.WARNING):
+        if link_delay <= 0:
+            raise Exception('sharded simulation needs a positive link delay')
+        self.shard_D = partition(topo_D, shards)
+        self.link_delay = link_delay
+        self.now = 0.0
+        self.windows = 0
+        self.next_L = [None] * shards #earliest pending event of each shard
+        self.inbox_L = [[] for k in range(shards)] #packets on their way into each shard
+        self.send_L = [[] for k in range(shards)] #udt_send calls waiting for each shard
+        node_S_L = [set() for k in range(shards)]
+        for name, k in self.shard_D.items():
+            node_S_L[k].add(name)
+        self.conn_L = []
+        self.process_L = []
+        for node_S in node_S_L:
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_shard, daemon=True,
+                                              args=(child_conn, topo_D, node_S, network_S, link_S,
+                                                    max_queue_size, link_delay, node_delay, log_level))
+            process.start()
+            self.conn_L.append(conn)
+            self.process_L.append(process)
+
+    ## send a command to every shard
+    # @return list of the replies
+    def call(self, command, *arg_L):
+        for conn in self.conn_L:
+            conn.send((command, arg_L))
+        return [conn.recv() for conn in self.conn_L]
+
+    ## have every router send its routing table to its neighbors
+    def send_routes(self):
+        for k, next_time in enumerate(self.call('send_routes')):
+            if next_time is not None:
+                self.next_L[k] = next_time if self.next_L[k] is None else min(self.next_L[k], next_time)
+
+    ## send a packet from a host, the arguments after src are passed to Host.udt_send
+    # @param delay: virtual time from now at which to send
+    # @param src: address of the sending host
+    def udt_send(self, delay, src, *arg_L):
+        self.send_L[self.shard_D[src]].append((self.now + delay, src, arg_L))
+
+    ## run windows until no events or packets are left
+    # @param until: stop before the first window starting later than this virtual time, None to drain
+    # @return the virtual time at the end of the last window
+    def run(self, until=None):
+        while True:
+            time_L = [t for t in self.next_L if t is not None]
+            time_L += [pkt[0] for inbox_L in self.inbox_L for pkt in inbox_L]
+            time_L += [send[0] for send_L in self.send_L for send in send_L]
+            if not time_L:
+                break
+            start = max(self.now, min(time_L))
+            if until is not None and start > until:
+                break
+            self.now = start + self.link_delay
+            self.windows += 1
+            #only shards with something to do in this window run it
+            active_L = [k for k in range(len(self.conn_L))
+                        if self.inbox_L[k] or self.send_L[k] or
+                        (self.next_L[k] is not None and self.next_L[k] <= self.now)]
+            for k in active_L:
+                self.conn_L[k].send(('window', (self.now, self.inbox_L[k], self.send_L[k])))
+                self.inbox_L[k] = []
+                self.send_L[k] = []
+            for k in active_L:
+                outbox_L, self.next_L[k] = self.conn_L[k].recv()
+                for pkt in outbox_L:
+                    self.inbox_L[self.shard_D[pkt[1]]].append(pkt)
+        return self.now
+
+    ## counters of every host and router, as metrics.snapshot
+    def snapshot(self):
+        snapshot_D = {}
+        for shard_snapshot_D in self.call('snapshot'):
+            snapshot_D.update(shard_snapshot_D)
+        return snapshot_D
+
+    ## forwarding tables of all the routers
+    # @return {router name: {destination: outgoing interface}}
+    def fib(self):
+        fib_D = {}
+        for shard_fib_D in self.call('fib'):
+            fib_D.update(shard_fib_D)
+        return fib_D
+
+    ## stop the shard processes
+    # @return number of events the shards processed
+    def stop(self):
+        events_run = sum(self.call('stop'))
+        for process in self.process_L:
+            process.join()
+        return events_run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sharded simulation speedup benchmark')
+    parser.add_argument('--topology', choices=sorted(benchmark.topology_D), default='grid')
+    parser.add_argument('--routers', type=int, default=100)
+    parser.add_argument('--packets', type=int, default=10000)
+    parser.add_argument('--interval', type=float, default=0.01, help='virtual time between sends')
+    parser.add_argument('--shards', default='1,2,4', help='comma separated shard counts to compare')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tracing.configure(logging.WARNING)
+    rng = random.Random(args.seed)
+    topo_D = topology.from_edges(benchmark.topology_D[args.topology](args.routers, rng), args.routers)
+    pair_L = []
+    for k in range(args.packets):
+        src = rng.randrange(args.routers) + 1
+        dst = rng.randrange(args.routers - 1) + 1
+        pair_L.append((src, dst if dst < src else dst + 1))
+
+    result_L = []
+    for shards in [int(s) for s in args.shards.split(',')]:
+        wall = time.perf_counter()
+        sim = ShardedSimulation(topo_D, shards)
+        sim.send_routes()
+        sim.run()
+        convergence = sim.now
+        for k, (src, dst) in enumerate(pair_L):
+            sim.udt_send(k * args.interval, src, dst, src, str(k))
+        sim.run()
+        delivered = sum(node_D.get('received', 0) for node_D in sim.snapshot().values())
+        windows = sim.windows
+        events_run = sim.stop()
+        wall = time.perf_counter() - wall
+        result_L.append({'shards': shards, 'wall_s': wall, 'convergence_time': convergence,
+                         'end_time': sim.now, 'windows': windows, 'events': events_run,
+                         'packets_sent': len(pair_L), 'packets_delivered': delivered})
+        log.warning('%d shards: %.2f s', shards, wall)
+    json.dump({'topology': args.topology, 'routers': args.routers, 'cpu_count': multiprocessing.cpu_count(),
+               'runs': result_L}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
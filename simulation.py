@@ -5,79 +5,106 @@ Created on Oct 12, 2016
 '''
 import network
 import link
+import event_sim
+import async_sim
+import topology
+import interface
+import tracing
+import logging
+import os
 import threading
 from time import sleep
 
 ##configuration parameters
+topology_file = 'topology.json' #hosts, routers and links of the simulated network
 router_queue_size = 0 #0 means unlimited
 simulation_time = 2 #give the network sufficient time to transfer all packets before quitting
+convergence_time = 1 #give the routing protocol time to converge before sending data
+runtime = 'threads' #'events' for a single-threaded discrete-event simulation, 'asyncio' for one coroutine per object on an asyncio event loop
+log_level = logging.DEBUG #logging.INFO hides the per-packet messages
+trace_file = None #file to dump a binary trace of packet events to, None for no trace
+interface_backend = 'queue' #'ring' keeps interface packets in preallocated ring buffers
+drop_policy = 'tail' #what a full router queue drops: 'tail' the arriving packet, 'head' the oldest one, 'red' random early drops
+packet_pool_size = 0 #packet objects kept for reuse by the hosts and routers, 0 to allocate every packet
 
 if __name__ == '__main__':
-    object_L = [] #keeps track of objects, so we can kill their threads
-    
-    #create network hosts
-    client = network.Host(1)
-    object_L.append(client)
-    server = network.Host(2)
-    object_L.append(server)
-    
-    #create routers and routing tables for connected clients (subnets)
-    router_a_rt_tbl_D = {1: {0: 1}} # packet to host 1 through interface 1 for cost 1
-    router_a = network.Router(name='A', 
-                              intf_cost_L=[1,1], 
-                              rt_tbl_D = router_a_rt_tbl_D, 
-                              max_queue_size=router_queue_size)
-    object_L.append(router_a)
-    router_b_rt_tbl_D = {2: {1: 3}} # packet to host 2 through interface 0 for cost 3
-    router_b = network.Router(name='B', 
-                              intf_cost_L=[1,3], 
-                              rt_tbl_D = router_b_rt_tbl_D, 
-                              max_queue_size=router_queue_size)
-    object_L.append(router_b)
-    
-    #create a Link Layer to keep track of links between network nodes
-    link_layer = link.LinkLayer()
-    object_L.append(link_layer)
-    
-    #add all the links
-    link_layer.add_link(link.Link(client, 0, router_a, 0))
-    link_layer.add_link(link.Link(router_a, 1, router_b, 0))
-    link_layer.add_link(link.Link(router_b, 1, server, 0))
+    trace_ring = tracing.TraceRing() if trace_file else None
+    tracing.configure(log_level, trace_ring)
+    interface.Interface.backend = interface_backend
+    interface.Interface.drop_policy = drop_policy
+    network.NetworkPacket.pool_size = packet_pool_size
+    #create hosts, routers with routing tables for their connected hosts, and the links between them
+    topo = topology.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), topology_file), network, link, router_queue_size)
+    object_L = topo.object_L #keeps track of objects, so we can kill their threads
+    link_layer = topo.link_layer
+    client = topo.host_D[1]
+    server = topo.host_D[2]
     
     #start all the objects
     thread_L = []
-    for obj in object_L:
-        thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
+    if runtime == 'events':
+        sim = event_sim.EventSimulator(link_layer, object_L)
+    elif runtime == 'asyncio':
+        sim = async_sim.AsyncSimulator(link_layer, object_L)
+    else:
+        for obj in object_L:
+            thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
+    #trace records are stamped with the runtime's clock, virtual time for the events runtime
+    if trace_ring is not None and runtime != 'threads':
+        trace_ring.clock = sim.clock
     
     for t in thread_L:
         t.start()
     
-    #send out routing information from router A to router B interface 0
-    router_a.send_routes(1)
+    #send out routing information from every router to its neighbors
+    for router in topo.router_D.values():
+        router.send_routes()
     
+    #wait for routing to converge so data packets have a route
+    if runtime != 'threads':
+        sim.run()
+    else:
+        sleep(convergence_time)
+
     #create some send events    
     for i in range(1):
         client.udt_send(2, 'Sample client data %d' % i)
         
     #give the network sufficient time to transfer all packets before quitting
-    sleep(simulation_time)
+    if runtime != 'threads':
+        sim.run()
+    else:
+        sleep(simulation_time)
 
     #create a reply event (part 3)
     for i in range(1):
         server.udt_send(1, 'Sample server reply %d' % i)
     
+    #deliver the replies before printing when there are no threads doing it
+    if runtime != 'threads':
+        sim.run()
+
     #print the final routing tables
-    for obj in object_L:
-        if str(type(obj)) == "<class 'network.Router'>":
-            obj.print_routes()
+    for router in topo.router_D.values():
+        router.print_routes()
     
-    #join all threads
+    #cancel the coroutines or join all threads
+    if runtime == 'asyncio':
+        sim.stop()
     for o in object_L:
         o.stop = True
     for t in thread_L:
         t.join()
         
-    print("All simulation threads joined")
+    if trace_ring is not None:
+        trace_ring.dump(trace_file)
+
+    if runtime == 'events':
+        print("Simulation finished at time %.1f after %d events" % (sim.now, sim.events_run))
+    elif runtime == 'asyncio':
+        print("All simulation coroutines cancelled")
+    else:
+        print("All simulation threads joined")
 
 
 
@@ -5,49 +5,34 @@ Created on Oct 12, 2016
 '''
 import network_1
 import link_1
+import event_sim
+import topology
+import os
 import threading
 from time import sleep
 
 ##configuration parameters
+topology_file = 'topology.json' #hosts, routers and links of the simulated network
 router_queue_size = 0 #0 means unlimited
 simulation_time = 2 #give the network sufficient time to transfer all packets before quitting
+event_driven = False #True runs a single-threaded discrete-event simulation instead of one thread per object
 
 if __name__ == '__main__':
-    object_L = [] #keeps track of objects, so we can kill their threads
-    
-    #create network hosts
-    client = network_1.Host(1)
-    object_L.append(client)
-    server = network_1.Host(2)
-    object_L.append(server)
-    
-    #create routers and routing tables for connected clients (subnets)
-    router_a_rt_tbl_D = {1: {0: 1}} # packet to host 1 through interface 1 for cost 1
-    router_a = network_1.Router(name='A', 
-                              intf_cost_L=[1,1], 
-                              rt_tbl_D = router_a_rt_tbl_D, 
-                              max_queue_size=router_queue_size)
-    object_L.append(router_a)
-    router_b_rt_tbl_D = {2: {1: 3}} # packet to host 2 through interface 0 for cost 3
-    router_b = network_1.Router(name='B', 
-                              intf_cost_L=[1,3], 
-                              rt_tbl_D = router_b_rt_tbl_D, 
-                              max_queue_size=router_queue_size)
-    object_L.append(router_b)
-    
-    #create a Link Layer to keep track of links between network nodes
-    link_layer = link_1.LinkLayer()
-    object_L.append(link_layer)
-    
-    #add all the links
-    link_layer.add_link(link_1.Link(client, 0, router_a, 0))
-    link_layer.add_link(link_1.Link(router_a, 1, router_b, 0))
-    link_layer.add_link(link_1.Link(router_b, 1, server, 0))
+    #create hosts, routers with routing tables for their connected hosts, and the links between them
+    topo = topology.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), topology_file), network_1, link_1, router_queue_size)
+    object_L = topo.object_L #keeps track of objects, so we can kill their threads
+    link_layer = topo.link_layer
+    client = topo.host_D[1]
+    server = topo.host_D[2]
+    router_a = topo.router_D['A']
     
     #start all the objects
     thread_L = []
-    for obj in object_L:
-        thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
+    if event_driven:
+        sim = event_sim.EventSimulator(link_layer, object_L)
+    else:
+        for obj in object_L:
+            thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
     
     for t in thread_L:
         t.start()
@@ -60,16 +45,22 @@ if __name__ == '__main__':
         client.udt_send(2, 'Sample client data %d' % i)
         
     #give the network sufficient time to transfer all packets before quitting
-    sleep(simulation_time)
+    if event_driven:
+        sim.run()
+    else:
+        sleep(simulation_time)
 
     #create a reply event (part 3)
     for i in range(1):
         server.udt_send(1, 'Sample server reply %d' % i)
     
+    #deliver the replies before printing when there are no threads doing it
+    if event_driven:
+        sim.run()
+
     #print the final routing tables
-    for obj in object_L:
-        if str(type(obj)) == "<class 'network_1.Router'>":
-            obj.print_routes()
+    for router in topo.router_D.values():
+        router.print_routes()
     
     #join all threads
     for o in object_L:
@@ -77,7 +68,10 @@ if __name__ == '__main__':
     for t in thread_L:
         t.join()
         
-    print("All simulation threads joined")
+    if event_driven:
+        print("Simulation finished at time %.1f after %d events" % (sim.now, sim.events_run))
+    else:
+        print("All simulation threads joined")
 
 
 
@@ -5,107 +5,126 @@ Created on Oct 12, 2016
 '''
 import network_2
 import link_2
+import event_sim
+import async_sim
+import topology
+import traffic
+import interface
+import tracing
+import logging
+import os
 import threading
 from time import sleep
 
 ##configuration parameters
+topology_file = 'topology_2.json' #hosts, routers and links of the simulated network
 router_queue_size = 0 #0 means unlimited
 simulation_time = 6 #give the network sufficient time to transfer all packets before quitting
+convergence_time = 1 #give the routing protocol time to converge before sending data
+runtime = 'threads' #'events' for a single-threaded discrete-event simulation, 'asyncio' for one coroutine per object on an asyncio event loop
+log_level = logging.DEBUG #logging.INFO hides the per-packet messages
+trace_file = None #file to dump a binary trace of packet events to, None for no trace
+interface_backend = 'queue' #'ring' keeps interface packets in preallocated ring buffers
+drop_policy = 'tail' #what a full router queue drops: 'tail' the arriving packet, 'head' the oldest one, 'red' random early drops
+packet_pool_size = 0 #packet objects kept for reuse by the hosts and routers, 0 to allocate every packet
+traffic_L = [] #workload models run after the sample packets, e.g. [{'model': 'poisson', 'src': 1, 'dst': 3, 'rate': 5}], see traffic.py
+traffic_time = 2 #time to generate traffic for
+traffic_seed = 0 #the same seed sends the same packets at the same times
 
 if __name__ == '__main__':
-    object_L = [] #keeps track of objects, so we can kill their threads
+    trace_ring = tracing.TraceRing() if trace_file else None
+    tracing.configure(log_level, trace_ring)
+    interface.Interface.backend = interface_backend
+    interface.Interface.drop_policy = drop_policy
+    network_2.NetworkPacket.pool_size = packet_pool_size
+    #create hosts, routers with routing tables for their connected hosts, and the links between them
+    topo = topology.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), topology_file), network_2, link_2, router_queue_size)
+    object_L = topo.object_L #keeps track of objects, so we can kill their threads
+    link_layer = topo.link_layer
+    host1 = topo.host_D[1]
+    host3 = topo.host_D[3]
     
-    #create network hosts
-    host1 = network_2.Host(1)
-    object_L.append(host1)
-    host2 = network_2.Host(2)
-    object_L.append(host2)
-    host3 = network_2.Host(3)
-    object_L.append(host3)
-    
-    #create forwarding table for routers
-    forwarding_table = [[['A', 2], ['B', 1], ['D', 2]], [['D', 1], ['C', 0], ['A', 0]]]
-    #create routers and routing tables for connected clients (subnets)
-    router_a_rt_tbl_D = {1: {0: 1}, 2: {1: 9}}
-    router_a = network_2.Router(name='A', 
-                              intf_cost_L=[1,9,1,2], 
-                              rt_tbl_D = router_a_rt_tbl_D, 
-                              max_queue_size=router_queue_size,
-                              forwarding_table = forwarding_table)
-    object_L.append(router_a)
-    router_b_rt_tbl_D = {1: {0: 2}, 3: {1: 5}}
-    router_b = network_2.Router(name='B', 
-                              intf_cost_L=[1,2], 
-                              rt_tbl_D = router_b_rt_tbl_D, 
-                              max_queue_size=router_queue_size,
-                              forwarding_table = forwarding_table)
-    object_L.append(router_b)
-    router_c_rt_tbl_D = {1: {0: 3}, 3: {1: 4}}
-    router_c = network_2.Router(name='C', 
-                              intf_cost_L=[2,1], 
-                              rt_tbl_D = router_c_rt_tbl_D, 
-                              max_queue_size=router_queue_size,
-                              forwarding_table = forwarding_table)
-    object_L.append(router_c)
-    router_d_rt_tbl_D = {3: {2: 3}}
-    router_d = network_2.Router(name='D', 
-                              intf_cost_L=[2,1,3], 
-                              rt_tbl_D = router_d_rt_tbl_D, 
-                              max_queue_size=router_queue_size,
-                              forwarding_table = forwarding_table)
-    object_L.append(router_d)
-    
-    #create a Link Layer to keep track of links between network nodes
-    link_layer = link_2.LinkLayer()
-    object_L.append(link_layer)
-    
-    #add all the links
-    link_layer.add_link(link_2.Link(host1, 0, router_a, 0))
-    link_layer.add_link(link_2.Link(host2, 0, router_a, 1))
-    link_layer.add_link(link_2.Link(router_a, 2, router_b, 0))
-    link_layer.add_link(link_2.Link(router_b, 1, router_d, 0))
-    link_layer.add_link(link_2.Link(router_d, 2, host3, 0))
-    
-    link_layer.add_link(link_2.Link(host3, 0, router_d, 2))
-    link_layer.add_link(link_2.Link(router_d, 1, router_c, 1))
-    link_layer.add_link(link_2.Link(router_c, 0, router_a, 3))
-    link_layer.add_link(link_2.Link(router_a, 0, host1, 0))
-
     #start all the objects
     thread_L = []
-    for obj in object_L:
-        thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
+    if runtime == 'events':
+        sim = event_sim.EventSimulator(link_layer, object_L)
+    elif runtime == 'asyncio':
+        sim = async_sim.AsyncSimulator(link_layer, object_L)
+    else:
+        for obj in object_L:
+            thread_L.append(threading.Thread(name=obj.__str__(), target=obj.run)) 
+    #trace records are stamped with the runtime's clock, virtual time for the events runtime
+    if trace_ring is not None and runtime != 'threads':
+        trace_ring.clock = sim.clock
     
     for t in thread_L:
         t.start()
     
-    #send out routing information from router B and router C
-    router_b.send_routes(1)
-    router_c.send_routes(3)
+    #send out routing information from every router to its neighbors
+    for router in topo.router_D.values():
+        router.send_routes()
  
+    #wait for routing to converge so data packets have a route
+    if runtime != 'threads':
+        sim.run()
+    else:
+        sleep(convergence_time)
+
     #create some send events    
     for i in range(1):
         host1.udt_send(3, 1, 'Sample host1 data %d' % i)
         
     #give the network sufficient time to transfer all packets before quitting
-    sleep(simulation_time)
+    if runtime != 'threads':
+        sim.run()
+    else:
+        sleep(simulation_time)
 
     #create some send events
     for i in range(1):
         host3.udt_send(1, 3, 'Sample host3 data %d' % i)
 
+    #deliver the replies before printing when there are no threads doing it
+    if runtime != 'threads':
+        sim.run()
+
+    #drive the configured workload models
+    if traffic_L:
+        generator = traffic.TrafficGenerator(topo.host_D, traffic_L, traffic_time, traffic_seed)
+        if runtime == 'events':
+            generator.schedule(sim)
+            sim.run()
+        elif runtime == 'asyncio':
+            sim.task_L.append(sim.loop.create_task(generator.play(sim.loop)))
+            sim.run(traffic_time)
+            sim.run()
+        else:
+            traffic_thread = threading.Thread(name=generator.__str__(), target=generator.run)
+            traffic_thread.start()
+            traffic_thread.join()
+            sleep(simulation_time)
+
     #print the final routing tables
-    for obj in object_L:
-        if str(type(obj)) == "<class 'network_2.Router'>":
-            obj.print_routes()
+    for router in topo.router_D.values():
+        router.print_routes()
     
-    #join all threads
+    #cancel the coroutines or join all threads
+    if runtime == 'asyncio':
+        sim.stop()
     for o in object_L:
         o.stop = True
     for t in thread_L:
         t.join()
         
-    print("All simulation threads joined")
+    if trace_ring is not None:
+        trace_ring.dump(trace_file)
+
+    if runtime == 'events':
+        print("Simulation finished at time %.1f after %d events" % (sim.now, sim.events_run))
+    elif runtime == 'asyncio':
+        print("All simulation coroutines cancelled")
+    else:
+        print("All simulation threads joined")
 
 
 
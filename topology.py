@@ -0,0 +1,171 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Builds hosts, routers and links from a topology description, e.g.
+
+{
+  "hosts": [1, 2],
+  "routers": [
+    {"name": "A", "intf_cost_L": [1, 1]},
+    {"name": "B", "intf_cost_L": [1, 3]}
+  ],
+  "links": [
+    [1, 0, "A", 0],
+    ["A", 1, "B", 0],
+    ["B", 1, 2, 0, {"bandwidth": 1500}]
+  ]
+}
+
+Hosts are named by their integer address and routers by their string name.
+Each link is [node_1, node_1_intf, node_2, node_2_intf] with an optional
+dict of Link options. A router's routing table starts with its directly
+connected hosts at the cost of the interface they are on; a "rt_tbl_D" entry
+on the router adds configured routes ({"destination": {"interface": cost}}),
+where a destination is a host address or a prefix such as "16/28".
+A "routing" dict at the top level, or on a router, passes routing options
+such as "hold_down", "refresh_interval" or "summary_D" to the Router
+constructor.
+'''
+import network_2
+import link_2
+import prefix
+import gc
+import json
+
+## a network built from a topology description
+class Topology:
+
+    ##@param topo_D: topology description, see the module documentation
+    # @param network: module providing Host and Router
+    # @param link: module providing Link and LinkLayer
+    # @param max_queue_size: max queue length of router interfaces
+    # @param node_S: names of the hosts and routers to build, None for all;
+    #   links to nodes outside the set are listed in boundary_L instead of built
+    def __init__(self, topo_D, network=network_2, link=link_2, max_queue_size=0, node_S=None):
+        #building allocates many long-lived objects and no garbage, so keep the
+        #cyclic garbage collector from rescanning them (halves the build time)
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.build(topo_D, network, link, max_queue_size, node_S)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    ## create the hosts, routers and links, see __init__ for the parameters
+    def build(self, topo_D, network, link, max_queue_size, node_S):
+        peer_D = peers(topo_D)
+        self.host_D = {} #address -> Host
+        self.router_D = {} #name -> Router
+        for addr in topo_D.get('hosts', []):
+            if node_S is None or addr in node_S:
+                self.host_D[addr] = network.Host(addr)
+
+        #routing tables start with the directly connected hosts
+        for router in topo_D.get('routers', []):
+            routing_D = dict(topo_D.get('routing', {}), **router.get('routing', {}))
+            name = router['name']
+            if node_S is not None and name not in node_S:
+                continue
+            rt_tbl_D = {}
+            for intf, cost in enumerate(router['intf_cost_L']):
+                peer = peer_D.get((name, intf))
+                if peer is not None and isinstance(peer[0], int):
+                    rt_tbl_D[peer[0]] = {intf: cost}
+            for dst, route_D in router.get('rt_tbl_D', {}).items():
+                rt_tbl_D[prefix.from_S(dst)] = {int(intf): cost for intf, cost in route_D.items()}
+            self.router_D[name] = network.Router(name=name,
+                                                 intf_cost_L=router['intf_cost_L'],
+                                                 rt_tbl_D=rt_tbl_D,
+                                                 max_queue_size=max_queue_size,
+                                                 **routing_D)
+
+        self.link_layer = link.LinkLayer()
+        ## links with one end outside node_S: (local node, interface, remote node name, interface, options)
+        self.boundary_L = []
+        for link_L in topo_D.get('links', []):
+            option_D = link_L[4] if len(link_L) > 4 else {}
+            inside_1 = node_S is None or link_L[0] in node_S
+            inside_2 = node_S is None or link_L[2] in node_S
+            if inside_1 and inside_2:
+                self.link_layer.add_link(link.Link(self.node(link_L[0]), link_L[1], self.node(link_L[2]), link_L[3], **option_D))
+            elif inside_1:
+                self.boundary_L.append((self.node(link_L[0]), link_L[1], link_L[2], link_L[3], option_D))
+            elif inside_2:
+                self.boundary_L.append((self.node(link_L[2]), link_L[3], link_L[0], link_L[1], option_D))
+
+        ## all objects with a run() thread target, in the order the simulation scripts start them
+        self.object_L = list(self.host_D.values()) + list(self.router_D.values()) + [self.link_layer]
+
+    ## look up a host by address or a router by name
+    def node(self, name):
+        if isinstance(name, int):
+            return self.host_D[name]
+        return self.router_D[name]
+
+    ## look up the link on an interface of a host or router
+    # @param name: host address or router name
+    # @param intf: interface number
+    def link(self, name, intf):
+        node = self.node(name)
+        for link in self.link_layer.link_L:
+            if (link.node_1 is node and link.node_1_intf == intf) or (link.node_2 is node and link.node_2_intf == intf):
+                return link
+        raise Exception('no link on interface %s of %s' % (intf, name))
+
+
+## build a network from a JSON topology file
+# @param filename: topology file
+# @param network: module providing Host and Router
+# @param link: module providing Link and LinkLayer
+# @param max_queue_size: max queue length of router interfaces
+def load(filename, network=network_2, link=link_2, max_queue_size=0):
+    with open(filename) as f:
+        return Topology(json.load(f), network, link, max_queue_size)
+
+
+## validate a topology description: node names are unique, linked nodes and
+# interfaces exist and each interface connects to a single peer
+# @param topo_D: topology description
+# @return {(node name, interface): (peer node name, peer interface)}
+def peers(topo_D):
+    intf_count_D = {} #node name -> number of interfaces
+    for addr in topo_D.get('hosts', []):
+        if addr in intf_count_D:
+            raise Exception('duplicate host %s' % addr)
+        intf_count_D[addr] = 1
+    for router in topo_D.get('routers', []):
+        if router['name'] in intf_count_D:
+            raise Exception('duplicate router %s' % router['name'])
+        intf_count_D[router['name']] = len(router['intf_cost_L'])
+    peer_D = {}
+    for link_L in topo_D.get('links', []):
+        end_L = [(link_L[0], link_L[1]), (link_L[2], link_L[3])]
+        for node, intf in end_L:
+            if node not in intf_count_D:
+                raise Exception('link %s: unknown %s %s' % (link_L, 'host' if isinstance(node, int) else 'router', node))
+            if not 0 <= intf < intf_count_D[node]:
+                raise Exception('link %s: %s has no interface %s' % (link_L, node, intf))
+        for (node, intf), peer in [(end_L[0], end_L[1]), (end_L[1], end_L[0])]:
+            if (node, intf) in peer_D:
+                raise Exception('link %s: interface %s of %s is already linked to %s' % (link_L, intf, node, peer_D[(node, intf)]))
+            peer_D[(node, intf)] = peer
+    return peer_D
+
+
+## topology description of routers '0'..'n-1' joined by edges, with host r+1
+# on interface 0 of router r and the edges on the following interfaces
+# @param edge_L: list of (router, router, cost) edges between router numbers
+# @param n: number of routers
+def from_edges(edge_L, n):
+    intf_cost_L = [[1] for r in range(n)]
+    link_L = [[r + 1, 0, str(r), 0] for r in range(n)]
+    for u, v, cost in edge_L:
+        link_L.append([str(u), len(intf_cost_L[u]), str(v), len(intf_cost_L[v])])
+        intf_cost_L[u].append(cost)
+        intf_cost_L[v].append(cost)
+    return {'hosts': list(range(1, n + 1)),
+            'routers': [{'name': str(r), 'intf_cost_L': intf_cost_L[r]} for r in range(n)],
+            'links': link_L}
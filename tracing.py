@@ -0,0 +1,123 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+'''
+import logging
+import struct
+import sys
+import time
+
+## logger for all simulator messages. Per-packet messages are logged at DEBUG
+# with the packet objects as arguments, which logging formats only when DEBUG
+# is on; arguments that take work to compute, such as packet lengths, are
+# computed under log.isEnabledFor(logging.DEBUG).
+log = logging.getLogger('simulator')
+
+## trace event codes
+SEND = 1
+RECEIVE = 2
+FORWARD = 3
+DROP = 4
+TRANSMIT = 5
+ROUTE_UPDATE = 6
+event_S_D = {SEND: 'send', RECEIVE: 'receive', FORWARD: 'forward', DROP: 'drop',
+             TRANSMIT: 'transmit', ROUTE_UPDATE: 'route_update'}
+
+## binary trace sink, None when tracing is off (see configure)
+sink = None
+
+## fixed-size ring buffer of binary trace records, the oldest records are
+# overwritten once it is full
+class TraceRing:
+    ## record layout: time, event code, node id, interface, destination address, packet length
+    record_struct = struct.Struct('!dBIHII')
+
+    ##@param capacity: number of records kept
+    # @param clock: function returning the current time, e.g. lambda: sim.now for virtual time
+    def __init__(self, capacity=65536, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.buffer = bytearray(capacity * self.record_struct.size)
+        self.count = 0 #total records ever written
+        #node names are stored once and referred to by id in the records
+        self.node_id_D = {}
+        self.node_L = []
+
+    ## append a record, overwriting the oldest one when the ring is full
+    # @param event: event code, e.g. FORWARD
+    # @param node: object the event happened at (its str() names it)
+    # @param intf: interface number
+    # @param dst_addr: destination address of the packet
+    # @param length: packet length in bytes
+    def record(self, event, node, intf, dst_addr, length):
+        node_S = str(node)
+        node_id = self.node_id_D.get(node_S)
+        if node_id is None:
+            node_id = self.node_id_D[node_S] = len(self.node_L)
+            self.node_L.append(node_S)
+        offset = (self.count % self.capacity) * self.record_struct.size
+        self.record_struct.pack_into(self.buffer, offset, self.clock(), event, node_id, intf, dst_addr, length)
+        self.count += 1
+
+    ## records currently held, oldest first
+    # @return list of (time, event_S, node_S, intf, dst_addr, length)
+    def records(self):
+        first = max(0, self.count - self.capacity)
+        record_L = []
+        for n in range(first, self.count):
+            offset = (n % self.capacity) * self.record_struct.size
+            t, event, node_id, intf, dst_addr, length = self.record_struct.unpack_from(self.buffer, offset)
+            record_L.append((t, event_S_D[event], self.node_L[node_id], intf, dst_addr, length))
+        return record_L
+
+    ## write the held records to a file for offline inspection with read()
+    # @param filename: file to write
+    def dump(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(struct.pack('!I', len(self.node_L)))
+            for node_S in self.node_L:
+                name = node_S.encode()
+                f.write(struct.pack('!B', len(name)) + name)
+            first = max(0, self.count - self.capacity)
+            f.write(struct.pack('!I', self.count - first))
+            for n in range(first, self.count):
+                offset = (n % self.capacity) * self.record_struct.size
+                f.write(self.buffer[offset : offset + self.record_struct.size])
+
+    ## read records written by dump()
+    # @param filename: file to read
+    # @return list of (time, event_S, node_S, intf, dst_addr, length)
+    @classmethod
+    def read(self, filename):
+        with open(filename, 'rb') as f:
+            byte_S = f.read()
+        offset = 0
+        node_L = []
+        (node_count,) = struct.unpack_from('!I', byte_S, offset)
+        offset += 4
+        for n in range(node_count):
+            (length,) = struct.unpack_from('!B', byte_S, offset)
+            node_L.append(byte_S[offset + 1 : offset + 1 + length].decode())
+            offset += 1 + length
+        (record_count,) = struct.unpack_from('!I', byte_S, offset)
+        offset += 4
+        record_L = []
+        for t, event, node_id, intf, dst_addr, length in self.record_struct.iter_unpack(
+                byte_S[offset : offset + record_count * self.record_struct.size]):
+            record_L.append((t, event_S_D[event], node_L[node_id], intf, dst_addr, length))
+        return record_L
+
+
+## set up simulator output
+# @param level: logging level, logging.DEBUG prints every packet, logging.INFO only start-up
+#  and shut-down, logging.WARNING only losses
+# @param ring: TraceRing to record packet events into, None to turn binary tracing off
+def configure(level=logging.DEBUG, ring=None):
+    global sink
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log.handlers = [handler]
+    log.setLevel(level)
+    log.propagate = False
+    sink = ring
@@ -0,0 +1,261 @@
+'''
+Created on Oct 12, 2016
+@author: mwitt_000
+@modified by: Megan Weller and Ashley Bertrand
+
+Traffic generator driving network_2's Host.udt_send from workload models:
+
+    cbr      a packet every interval from src to dst
+    poisson  packets from src to dst at exponentially distributed intervals
+    on_off   bursts at a constant rate, separated by silences; the burst and
+             silence lengths are exponentially distributed
+    gravity  packets between every pair of hosts, a pair sending in proportion
+             to the product of the two hosts' weights
+    trace    replay of a trace file with a 'time src dst [size]' line per packet
+
+A model is configured by a dict such as {"model": "poisson", "src": 1,
+"dst": 3, "rate": 0.5}, the other keys being the arguments of its class.
+Every model draws from its own random generator seeded from the generator's
+seed, so the same seed gives the same packets at the same times, and adding
+a model leaves the packets of the others unchanged. Times are in the
+simulator's time units: virtual time for the discrete-event simulator,
+seconds for threads and asyncio.
+'''
+import asyncio
+import random
+import time
+
+## constant bit rate
+class ConstantRate:
+
+    ##@param src: address of the sending host
+    # @param dst: address of the receiving host
+    # @param interval: time between packets
+    # @param start: time of the first packet
+    # @param size: payload length in bytes, 0 for a short label
+    def __init__(self, src, dst, interval, start=0, size=0):
+        if interval <= 0:
+            raise Exception('cbr: interval must be positive, not %s' % interval)
+        self.src = src
+        self.dst = dst
+        self.interval = interval
+        self.start = start
+        self.size = size
+
+    ## packets sent before a time
+    # @param rng: random generator of the model
+    # @param duration: time to stop at
+    # @param host_L: addresses of all hosts
+    # @return list of (time, src, dst, size)
+    def sends(self, rng, duration, host_L):
+        send_L = []
+        k = 0
+        while self.start + k * self.interval < duration:
+            send_L.append((self.start + k * self.interval, self.src, self.dst, self.size))
+            k += 1
+        return send_L
+
+
+## Poisson arrivals
+class Poisson:
+
+    ##@param src: address of the sending host
+    # @param dst: address of the receiving host
+    # @param rate: mean packets per time unit
+    # @param start: time the arrivals start from
+    # @param size: payload length in bytes, 0 for a short label
+    def __init__(self, src, dst, rate, start=0, size=0):
+        if rate <= 0:
+            raise Exception('poisson: rate must be positive, not %s' % rate)
+        self.src = src
+        self.dst = dst
+        self.rate = rate
+        self.start = start
+        self.size = size
+
+    ## see ConstantRate.sends
+    def sends(self, rng, duration, host_L):
+        send_L = []
+        t = self.start + rng.expovariate(self.rate)
+        while t < duration:
+            send_L.append((t, self.src, self.dst, self.size))
+            t += rng.expovariate(self.rate)
+        return send_L
+
+
+## on/off bursts
+class OnOff:
+
+    ##@param src: address of the sending host
+    # @param dst: address of the receiving host
+    # @param interval: time between packets during a burst
+    # @param on_time: mean length of a burst
+    # @param off_time: mean length of a silence
+    # @param start: time the first burst starts
+    # @param size: payload length in bytes, 0 for a short label
+    def __init__(self, src, dst, interval, on_time, off_time, start=0, size=0):
+        if interval <= 0 or on_time <= 0 or off_time <= 0:
+            raise Exception('on_off: interval, on_time and off_time must be positive')
+        self.src = src
+        self.dst = dst
+        self.interval = interval
+        self.on_time = on_time
+        self.off_time = off_time
+        self.start = start
+        self.size = size
+
+    ## see ConstantRate.sends
+    def sends(self, rng, duration, host_L):
+        send_L = []
+        t = self.start
+        while t < duration:
+            end = t + rng.expovariate(1.0 / self.on_time)
+            while t < min(end, duration):
+                send_L.append((t, self.src, self.dst, self.size))
+                t += self.interval
+            t = end + rng.expovariate(1.0 / self.off_time)
+        return send_L
+
+
+## gravity-model traffic matrix: Poisson arrivals over all host pairs, pair
+# (src, dst) sending a share of the rate proportional to weight[src] * weight[dst]
+class Gravity:
+
+    ##@param rate: mean packets per time unit over all pairs
+    # @param weight_D: {host address: weight}, hosts left out weigh 1; None for equal weights
+    # @param hosts: addresses of the hosts taking part, None for all
+    # @param start: time the arrivals start from
+    # @param size: payload length in bytes, 0 for a short label
+    def __init__(self, rate, weight_D=None, hosts=None, start=0, size=0):
+        if rate <= 0:
+            raise Exception('gravity: rate must be positive, not %s' % rate)
+        self.rate = rate
+        self.weight_D = {int(addr): weight for addr, weight in (weight_D or {}).items()}
+        self.hosts = hosts
+        self.start = start
+        self.size = size
+
+    ## see ConstantRate.sends
+    def sends(self, rng, duration, host_L):
+        host_L = sorted(self.hosts if self.hosts is not None else host_L)
+        weight_L = [self.weight_D.get(addr, 1) for addr in host_L]
+        if len([weight for weight in weight_L if weight > 0]) < 2:
+            raise Exception('gravity: needs two hosts of positive weight')
+        send_L = []
+        t = self.start + rng.expovariate(self.rate)
+        while t < duration:
+            #drawing both ends by weight and redrawing src == dst picks each
+            #pair in proportion to the product of the weights
+            src, dst = rng.choices(host_L, weight_L, k=2)
+            while src == dst:
+                src, dst = rng.choices(host_L, weight_L, k=2)
+            send_L.append((t, src, dst, self.size))
+            t += rng.expovariate(self.rate)
+        return send_L
+
+
+## replay of a trace file
+class Trace:
+
+    ##@param filename: trace with a 'time src dst [size]' line per packet,
+    #   blank lines and lines starting with # are skipped
+    # @param start: time added to the trace times
+    def __init__(self, filename, start=0):
+        self.filename = filename
+        self.start = start
+
+    ## see ConstantRate.sends
+    def sends(self, rng, duration, host_L):
+        send_L = []
+        with open(self.filename) as f:
+            for line_num, line in enumerate(f, 1):
+                field_L = line.split()
+                if not field_L or field_L[0].startswith('#'):
+                    continue
+                if len(field_L) not in (3, 4):
+                    raise Exception('%s:%d: expected time src dst [size]' % (self.filename, line_num))
+                t = self.start + float(field_L[0])
+                if t < duration:
+                    send_L.append((t, int(field_L[1]), int(field_L[2]), int(field_L[3]) if len(field_L) > 3 else 0))
+        return send_L
+
+
+## workload models by their configuration name
+model_D = {'cbr': ConstantRate, 'poisson': Poisson, 'on_off': OnOff, 'gravity': Gravity, 'trace': Trace}
+
+## build a model from its configuration
+# @param config_D: {"model": name, argument: value, ...}
+def model(config_D):
+    config_D = dict(config_D)
+    name = config_D.pop('model', None)
+    if name not in model_D:
+        raise Exception('unknown traffic model %s, expected one of %s' % (name, ', '.join(sorted(model_D))))
+    return model_D[name](**config_D)
+
+
+## Sends the packets of a list of workload models to the hosts. The packets
+# are drawn once, in sends(); schedule(), run() and play() then hand them to
+# Host.udt_send on the discrete-event simulator, on a thread or on an asyncio
+# event loop respectively.
+class TrafficGenerator:
+
+    ##@param host_D: {address: Host} of the sending hosts
+    # @param model_L: workload models, or their configuration dicts
+    # @param duration: time to stop sending at, from the start of the traffic
+    # @param seed: seed of the random generators
+    def __init__(self, host_D, model_L, duration, seed=0):
+        self.host_D = host_D
+        self.model_L = [model(m) if isinstance(m, dict) else m for m in model_L]
+        self.duration = duration
+        self.seed = seed
+        self.send_L = None #drawn on first use
+        self.stop = False #for thread termination
+
+    ## called when printing the object
+    def __str__(self):
+        return 'TrafficGenerator'
+
+    ## the packets to send
+    # @return list of (time, src, dst, size) in time order
+    def sends(self):
+        if self.send_L is None:
+            seed_rng = random.Random(self.seed)
+            send_L = []
+            for m in self.model_L:
+                #each model has its own generator so that models do not shift each other's draws
+                send_L += m.sends(random.Random(seed_rng.getrandbits(64)), self.duration, sorted(self.host_D))
+            for t, src, dst, size in send_L:
+                if src not in self.host_D:
+                    raise Exception('traffic from unknown host %s' % src)
+            #sort on time alone, so packets of the same time keep the model order
+            self.send_L = sorted(send_L, key=lambda send: send[0])
+        return self.send_L
+
+    ## send packet k
+    def send(self, k, src, dst, size):
+        data_S = 'traffic %d' % k
+        self.host_D[src].udt_send(dst, src, data_S + '.' * (size - len(data_S)))
+
+    ## schedule the packets on an EventSimulator, from its current time
+    def schedule(self, sim):
+        for k, (t, src, dst, size) in enumerate(self.sends()):
+            sim.schedule(t, self.send, k, src, dst, size)
+
+    ## thread target sending the packets at their times in seconds from the start of the thread
+    def run(self):
+        start = time.perf_counter()
+        for k, (t, src, dst, size) in enumerate(self.sends()):
+            while not self.stop and time.perf_counter() - start < t:
+                time.sleep(min(0.01, t - (time.perf_counter() - start)))
+            if self.stop:
+                return
+            self.send(k, src, dst, size)
+
+    ## coroutine sending the packets at their times in seconds, for the AsyncSimulator
+    # event loop, e.g. sim.loop.create_task(generator.play(sim.loop))
+    # @param loop: event loop the coroutine runs on
+    async def play(self, loop):
+        start = loop.time()
+        for k, (t, src, dst, size) in enumerate(self.sends()):
+            await asyncio.sleep(max(0, start + t - loop.time()))
+            self.send(k, src, dst, size)